@@ -0,0 +1,110 @@
+# backend/app/compression.py
+"""Content-Encoding negotiation (brotli when installed, else gzip) for responses above a size threshold."""
+import os
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Encodings to offer, in order of preference (empty disables compression)
+RESPONSE_COMPRESSION = os.environ.get("RESPONSE_COMPRESSION", "br,gzip")
+# Bodies smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Codings the client accepts, ignoring those it marks q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _WeakETagMixin:
+    content_encoding: str
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def send_weakened(message: Message) -> None:
+            # An encoded body is a different representation, so its
+            # validator can no longer be strong
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == self.content_encoding:
+                    headers["ETag"] = f"W/{etag}"
+            await send(message)
+
+        await super().__call__(scope, receive, send_weakened)
+
+
+class GzipEncoder(_WeakETagMixin, GZipResponder):
+    pass
+
+
+class BrotliEncoder(_WeakETagMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        data = self.compressor.process(body)
+        if not more_body:
+            data += self.compressor.finish()
+        return data
+
+
+class CompressionMiddleware:
+    """Compress responses with the first configured encoding the client accepts"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Optional[Sequence[str]] = None,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+    ) -> None:
+        self.app = app
+        if encodings is None:
+            encodings = [e.strip() for e in RESPONSE_COMPRESSION.split(",") if e.strip()]
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and brotli is not None)]
+        self.minimum_size = minimum_size
+
+    def _choose(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.encodings:
+            if encoding in accepted or "*" in accepted:
+                return encoding
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding == "br":
+            responder = BrotliEncoder(self.app, self.minimum_size)
+        elif encoding == "gzip":
+            responder = GzipEncoder(self.app, self.minimum_size, compresslevel=GZIP_LEVEL)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
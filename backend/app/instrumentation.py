@@ -0,0 +1,91 @@
+# backend/app/instrumentation.py
+"""Per-route request metrics and logging setup for the API process."""
+import json
+import logging
+import os
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "text" for humans, "json" for one object per line (log shippers)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Requests slower than this many seconds are logged as warnings (0 disables)
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "1.0"))
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields kept as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """Send the backend's loggers to stderr at `level`, unless the host already configured them"""
+    backend_logger = logging.getLogger("backend")
+    backend_logger.setLevel(level)
+    if logging.getLogger().handlers or backend_logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    backend_logger.addHandler(handler)
+
+
+class MetricsMiddleware:
+    """Count requests and time them per route template (e.g. /movies/{movie_id})"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not metrics.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # The router stores the matched route in the scope; unmatched
+            # paths share one label so they cannot blow up the series count
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or "unmatched"
+            method = scope["method"]
+            metrics.http_requests.inc(method, template, str(status_code))
+            metrics.http_request_duration.observe(elapsed, method, template)
+            if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+                logger.warning(
+                    "Slow request %s %s took %.3fs", method, scope["path"], elapsed,
+                    extra={"route": template, "status": status_code, "duration": round(elapsed, 6)},
+                )
@@ -1,12 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from backend.app.compression import CompressionMiddleware
+from backend.app.instrumentation import MetricsMiddleware, configure_logging
+from backend import metrics, storage
 from backend.authentication import router as authentication_router
+from backend.authentication import security
 from backend.movies import router as movie_router
+from backend.movies import utils as movie_utils
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Load the movie catalog once, before the first request
+  movie_utils.warm_up()
+  movie_utils.user_data_store.load()
+  if metrics.PROFILER_ENABLED:
+    metrics.profiler.start()
+  yield
+  metrics.profiler.stop()
+  storage.shutdown_io_executor()
+  movie_utils.user_data_store.close()
+  security.shutdown_bcrypt_executor()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(authentication_router.router, prefix="/auth", tags=["auth"])
 app.router.include_router(movie_router.router)
+app.router.include_router(movie_router.reviews_router)
+
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
   CORSMiddleware,
@@ -14,6 +41,8 @@ app.add_middleware(
   allow_credentials=True,
   allow_methods=["*"],
   allow_headers=["*"],
+  # Paging cursor and cache validator, read by the frontend across origins
+  expose_headers=["X-Next-Offset", "ETag"],
 )
 
 @app.get("/")
@@ -22,4 +51,31 @@ async def read_root():
 
 @app.get("/ping")
 async def ping():
-  return {"message": "pong"}
\ No newline at end of file
+  return {"message": "pong"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+  if not metrics.METRICS_ENABLED:
+    raise HTTPException(status_code=404, detail="Not Found")
+  return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Sampling profiler, for debugging a live process; output is folded stacks
+@app.get("/admin/profiler", dependencies=[Depends(security.require_admin)])
+async def profiler_status():
+  return metrics.profiler.status()
+
+@app.post("/admin/profiler/start", dependencies=[Depends(security.require_admin)])
+async def start_profiler(reset: bool = True):
+  if reset:
+    metrics.profiler.reset()
+  metrics.profiler.start()
+  return metrics.profiler.status()
+
+@app.post("/admin/profiler/stop", dependencies=[Depends(security.require_admin)])
+async def stop_profiler():
+  metrics.profiler.stop()
+  return metrics.profiler.status()
+
+@app.get("/admin/profiler/stacks", dependencies=[Depends(security.require_admin)])
+async def profiler_stacks():
+  return PlainTextResponse(metrics.profiler.folded())
@@ -0,0 +1,299 @@
+# backend/authentication/repository.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.storage import run_io
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of users.json for outside edits (0 disables them)
+USERS_REFRESH_INTERVAL = float(os.environ.get("USERS_REFRESH_INTERVAL", "5"))
+
+
+class DuplicateUserError(ValueError):
+    """A username or email that must be unique is already taken"""
+
+
+class UserRepository:
+    """Users held in memory with hash indexes on id, username and email.
+
+    Loaded once; writes go straight through to the backing file. Edits made
+    to the file by anything else are picked up when its mtime changes; with
+    `generations`, writes by other workers are picked up on the next access
+    and `lock` also excludes them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        load: Callable[[], List[Dict[str, Any]]],
+        save: Callable[[List[Dict[str, Any]]], None],
+        refresh_interval: float = USERS_REFRESH_INTERVAL,
+        generations=None,
+    ):
+        self.path = path
+        self._load_users = load
+        self._save_users = save
+        self.refresh_interval = refresh_interval
+        self.generations = generations
+        self._generation = None
+        self.lock = generations.lock("users") if generations is not None else threading.RLock()
+        self._users: List[Dict[str, Any]] = []
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_username: Dict[str, Dict[str, Any]] = {}
+        self._by_email: Dict[str, Dict[str, Any]] = {}
+        self._stamp = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[Optional[int]], None]] = []
+
+    def add_listener(self, callback: Callable[[Optional[int]], None]) -> None:
+        """Call callback(user_id) after a user changes, or callback(None) after a reload"""
+        self._listeners.append(callback)
+
+    def _notify(self, user_id: Optional[int]) -> None:
+        for callback in self._listeners:
+            callback(user_id)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _index(self, users: List[Dict[str, Any]]) -> None:
+        self._users = users
+        self._by_id = {u["id"]: u for u in users}
+        self._by_username = {u["username"]: u for u in users}
+        self._by_email = {u["email"]: u for u in users}
+
+    def reload(self) -> None:
+        with self.lock:
+            if self.generations is not None:
+                self._generation = self.generations.get("users")
+            stamp = self._file_stamp()
+            self._index(self._load_users())
+            self._stamp = stamp
+            self._loaded = True
+            self._checked_at = time.monotonic()
+            logger.debug("Loaded %d users from %s", len(self._users), self.path)
+        self._notify(None)
+
+    def ensure_fresh(self) -> None:
+        """Load on first use, then reload only if the file changed underneath us"""
+        if not self._loaded:
+            self.reload()
+        elif self.generations is not None and self.generations.get("users") != self._generation:
+            self.reload()
+        elif self.refresh_interval > 0 and time.monotonic() - self._checked_at >= self.refresh_interval:
+            self._checked_at = time.monotonic()
+            if self._file_stamp() != self._stamp:
+                self.reload()
+
+    def is_fresh(self) -> bool:
+        """True when reads can be answered from memory without touching the file"""
+        if not self._loaded:
+            return False
+        if self.generations is not None and self.generations.get("users") != self._generation:
+            return False
+        return not (self.refresh_interval > 0 and time.monotonic() - self._checked_at >= self.refresh_interval)
+
+    def get_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        self.ensure_fresh()
+        return self._by_id.get(user_id)
+
+    def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        self.ensure_fresh()
+        return self._by_username.get(username)
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        self.ensure_fresh()
+        return self._by_email.get(email)
+
+    def all(self) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        return list(self._users)
+
+    def _persist(self, users: List[Dict[str, Any]]) -> None:
+        self._save_users(users)
+        self._index(users)
+        self._stamp = self._file_stamp()
+        if self.generations is not None:
+            self._generation = self.generations.bump("users")
+
+    def create(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Assign the next id, store the user and write the file"""
+        with self.lock:
+            self.ensure_fresh()
+            new_user = {"id": max(self._by_id, default=0) + 1, **user}
+            self._persist(self._users + [new_user])
+            return new_user
+
+    def update(self, user_id: int, **changes: Any) -> Optional[Dict[str, Any]]:
+        """Apply field changes to a user and write the file; None if there is no such user"""
+        with self.lock:
+            self.ensure_fresh()
+            if user_id not in self._by_id:
+                return None
+            users = [{**u, **changes} if u["id"] == user_id else u for u in self._users]
+            self._persist(users)
+        self._notify(user_id)
+        return self._by_id[user_id]
+
+    # Async variants: reads stay on the event loop while the in-memory copy
+    # is current; a reload and every write go to the I/O executor
+
+    async def _read_async(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.is_fresh():
+            return func(*args)
+        return await run_io(func, *args)
+
+    async def ensure_fresh_async(self) -> None:
+        if not self.is_fresh():
+            await run_io(self.ensure_fresh)
+
+    async def get_by_id_async(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return await self._read_async(self.get_by_id, user_id)
+
+    async def get_by_username_async(self, username: str) -> Optional[Dict[str, Any]]:
+        return await self._read_async(self.get_by_username, username)
+
+    async def get_by_email_async(self, email: str) -> Optional[Dict[str, Any]]:
+        return await self._read_async(self.get_by_email, email)
+
+    async def all_async(self) -> List[Dict[str, Any]]:
+        return await self._read_async(self.all)
+
+    async def create_async(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        return await run_io(self.create, user)
+
+    async def update_async(self, user_id: int, **changes: Any) -> Optional[Dict[str, Any]]:
+        return await run_io(self.update, user_id, **changes)
+
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "role")
+
+
+class SQLiteUserRepository:
+    """UserRepository backed by the users table of a backend.database.Database.
+
+    Ids come from AUTOINCREMENT and uniqueness of username/email is enforced
+    by the table, so separate processes can register users concurrently.
+    Nothing is cached here, but listeners (the token cache) are told when
+    another worker changes a user, through `generations`.
+    """
+
+    def __init__(self, db, generations=None):
+        self.db = db
+        self.path = db.path
+        self.generations = generations
+        self._generation = None
+        # Kept for callers that serialize check -> write sequences in-process
+        self.lock = threading.RLock()
+        self._listeners: List[Callable[[Optional[int]], None]] = []
+
+    def add_listener(self, callback: Callable[[Optional[int]], None]) -> None:
+        self._listeners.append(callback)
+
+    def _notify(self, user_id: Optional[int]) -> None:
+        for callback in self._listeners:
+            callback(user_id)
+
+    def reload(self) -> None:
+        self._notify(None)
+
+    def ensure_fresh(self) -> None:
+        if self.generations is not None:
+            generation = self.generations.get("users")
+            if generation != self._generation:
+                self._generation = generation
+                self._notify(None)
+
+    def _one(self, sql: str, *params: Any) -> Optional[Dict[str, Any]]:
+        row = self.db.connection.execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._one("SELECT * FROM users WHERE id = ?", user_id)
+
+    def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        return self._one("SELECT * FROM users WHERE username = ?", username)
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._one("SELECT * FROM users WHERE email = ?", email)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.db.connection.execute("SELECT * FROM users ORDER BY id")]
+
+    def create(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a user and return it with its assigned id"""
+        fields = {k: user[k] for k in USER_COLUMNS if k in user}
+        placeholders = ", ".join("?" for _ in fields)
+        try:
+            with self.db.transaction() as conn:
+                cursor = conn.execute(
+                    f"INSERT INTO users ({', '.join(fields)}) VALUES ({placeholders})", tuple(fields.values())
+                )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUserError(str(e)) from e
+        if self.generations is not None:
+            self._generation = self.generations.bump("users")
+        return self.get_by_id(cursor.lastrowid)
+
+    def update(self, user_id: int, **changes: Any) -> Optional[Dict[str, Any]]:
+        unknown = set(changes) - set(USER_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown))}")
+        if changes:
+            assignments = ", ".join(f"{name} = ?" for name in changes)
+            try:
+                with self.db.transaction() as conn:
+                    cursor = conn.execute(f"UPDATE users SET {assignments} WHERE id = ?", (*changes.values(), user_id))
+            except sqlite3.IntegrityError as e:
+                raise DuplicateUserError(str(e)) from e
+            if cursor.rowcount == 0:
+                return None
+            if self.generations is not None:
+                self._generation = self.generations.bump("users")
+            self._notify(user_id)
+        return self.get_by_id(user_id)
+
+    def import_users(self, users: List[Dict[str, Any]]) -> int:
+        """Copy users (keeping their ids) into the table; returns how many were new"""
+        added = 0
+        with self.db.transaction() as conn:
+            for user in users:
+                values = tuple(user.get(k) for k in USER_COLUMNS[:-1]) + (user.get("role", "user"),)
+                added += conn.execute(
+                    f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}) VALUES (?, ?, ?, ?, ?)", values
+                ).rowcount
+        return added
+
+    # Async variants: every read is a query, so all of them go to the I/O executor
+
+    async def ensure_fresh_async(self) -> None:
+        # A shared-memory read, fine on the event loop
+        self.ensure_fresh()
+
+    async def get_by_id_async(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return await run_io(self.get_by_id, user_id)
+
+    async def get_by_username_async(self, username: str) -> Optional[Dict[str, Any]]:
+        return await run_io(self.get_by_username, username)
+
+    async def get_by_email_async(self, email: str) -> Optional[Dict[str, Any]]:
+        return await run_io(self.get_by_email, email)
+
+    async def all_async(self) -> List[Dict[str, Any]]:
+        return await run_io(self.all)
+
+    async def create_async(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        return await run_io(self.create, user)
+
+    async def update_async(self, user_id: int, **changes: Any) -> Optional[Dict[str, Any]]:
+        return await run_io(self.update, user_id, **changes)
@@ -2,41 +2,62 @@
 # [file content begin]
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from backend.storage import run_io
 from backend.authentication import schemas, utils, security
+from backend.authentication.repository import DuplicateUserError
 from backend.authentication.schemas import UserRole
 from backend.authentication.security import require_role, require_admin, require_moderator
 
 router = APIRouter()
 
-@router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate):
-    users = utils.load_users()
+def _create_user(user: schemas.UserCreate, hashed_password: str) -> dict:
+    with utils.users_lock:
+        # Check if username already exists
+        if utils.user_repository.get_by_username(user.username):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already taken"
+            )
+
+        # Check if email already exists
+        if utils.user_repository.get_by_email(user.email):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+
+        # Create new user object
+        try:
+            return utils.user_repository.create({
+                "username": user.username,
+                "email": user.email,
+                "hashed_password": hashed_password,
+                "role": user.role.value  # Store enum value
+            })
+        except DuplicateUserError:
+            # Another process registered the same name/email after our checks
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered"
+            )
 
-    # Check if username already exists
-    if any(u["username"] == user.username for u in users):
+@router.post("/register", response_model=schemas.UserResponse)
+async def register(user: schemas.UserCreate):
+    # Cheap duplicate checks first so taken names and emails don't cost a
+    # bcrypt hash; _create_user repeats them under the lock
+    if await utils.user_repository.get_by_username_async(user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
-
-    # Check if email already exists
-    if any(u["email"] == user.email for u in users):
+    if await utils.user_repository.get_by_email_async(user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    # Create new user object
-    new_user = {
-        "id": len(users) + 1,
-        "username": user.username,
-        "email": user.email,
-        "hashed_password": security.hash_password(user.password),
-        "role": user.role.value  # Store enum value
-    }
-
-    users.append(new_user)
-    utils.save_users(users)
+    hashed_password = await security.hash_password_async(user.password)
+    new_user = await run_io(_create_user, user, hashed_password)
 
     # Return only safe user data (no password)
     return {
@@ -46,17 +67,26 @@ def register(user: schemas.UserCreate):
     }
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    users = utils.load_users()
-    user = next((u for u in users if u["username"] == form_data.username), None)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await utils.user_repository.get_by_username_async(form_data.username)
 
-    if not user or not security.verify_password(form_data.password, user["hashed_password"]):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await security.verify_and_update_password_async(
+            form_data.password, user["hashed_password"]
+        )
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Stored hash used an outdated bcrypt cost: upgrade it now we know the password
+    if new_hash:
+        await utils.user_repository.update_async(user["id"], hashed_password=new_hash)
+
     access_token = security.create_access_token(
         data={"sub": user["username"], "user_id": user["id"], "role": user["role"]}
     )
@@ -67,7 +97,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     }
 
 @router.post("/logout")
-def logout():
+async def logout():
     """
     Logout endpoint. For JWTs, this is stateless: instruct the client to discard the token.
     """
@@ -77,12 +107,12 @@ def logout():
 # Protected routes with role-based access
 
 @router.get("/me", response_model=schemas.UserResponse)
-def get_current_user(current_user: schemas.UserResponse = Depends(security.get_current_user)):
+async def get_current_user(current_user: schemas.UserResponse = Depends(security.get_current_user)):
     """Get current user info with review stats"""
-    from backend.movies.utils import get_user_review_stats
+    from backend.movies.utils import get_user_review_stats, read_user_data_async
     
     user_dict = current_user.dict()
-    user_dict["review_stats"] = get_user_review_stats(current_user.id)
+    user_dict["review_stats"] = await read_user_data_async(get_user_review_stats, current_user.id)
     
     # Add empty penalties array if not present
     if "penalties" not in user_dict:
@@ -91,25 +121,25 @@ def get_current_user(current_user: schemas.UserResponse = Depends(security.get_c
     return user_dict
 
 @router.get("/admin-only")
-def admin_only_route(current_user = Depends(security.require_admin)):
+async def admin_only_route(current_user = Depends(security.require_admin)):
     """Only accessible by admins"""
     return {"message": "Welcome admin!", "user": current_user.username}
 
 @router.get("/moderator-dashboard")
-def moderator_dashboard(current_user = Depends(security.require_moderator)):
+async def moderator_dashboard(current_user = Depends(security.require_moderator)):
     """Accessible by moderators and admins"""
     return {"message": "Moderator dashboard", "user": current_user.username}
 
 @router.get("/user-profile")
-def user_profile(current_user = Depends(security.require_role(UserRole.USER))):
+async def user_profile(current_user = Depends(security.require_role(UserRole.USER))):
     """Accessible by all authenticated users"""
     return {"message": "User profile", "user": current_user.username}
 
 # Admin management endpoints
 @router.get("/users", dependencies=[Depends(security.require_admin)])
-def list_all_users():
+async def list_all_users():
     """List all users (admin only)"""
-    users = utils.load_users()
+    users = await utils.user_repository.all_async()
     # Remove passwords from response
     safe_users = [
         {k: v for k, v in user.items() if k != "hashed_password"}
@@ -118,16 +148,12 @@ def list_all_users():
     return {"users": safe_users}
 
 @router.put("/users/{user_id}/role", dependencies=[Depends(security.require_admin)])
-def update_user_role(user_id: int, role_update: schemas.UserUpdate):
+async def update_user_role(user_id: int, role_update: schemas.UserUpdate):
     """Update user role (admin only)"""
-    users = utils.load_users()
-    
-    user_index = next((i for i, u in enumerate(users) if u["id"] == user_id), None)
-    if user_index is None:
+    if await utils.user_repository.get_by_id_async(user_id) is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     if role_update.role:
-        users[user_index]["role"] = role_update.role.value
+        await utils.user_repository.update_async(user_id, role=role_update.role.value)
     
-    utils.save_users(users)
     return {"message": "User role updated successfully"}
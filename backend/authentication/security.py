@@ -1,14 +1,20 @@
 # [file name]: security.py
 # [file content begin]
 from passlib.context import CryptContext
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from backend import metrics
 from backend.authentication import utils, models
 from backend.authentication.schemas import UserRole
 
@@ -16,11 +22,21 @@ from backend.authentication.schemas import UserRole
 SECRET_KEY = os.environ.get("SECRET_KEY", "devsecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Verified tokens remembered by get_current_user
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
 
 # OAuth2 scheme (FastAPI dependency)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor for new hashes; hashes at any other cost are upgraded on login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Where bcrypt runs: "thread" (dedicated thread pool) or "process" (process pool)
+BCRYPT_EXECUTOR = os.environ.get("BCRYPT_EXECUTOR", "thread")
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashing jobs allowed to be queued or running before new ones get a 503
+BCRYPT_MAX_QUEUE = int(os.environ.get("BCRYPT_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
@@ -30,6 +46,61 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if the stored one uses an outdated cost."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt runs off the event loop and off Starlette's shared threadpool
+_bcrypt_executor: Optional[Executor] = None
+_bcrypt_pending = 0
+
+def _get_bcrypt_executor() -> Executor:
+    global _bcrypt_executor
+    if _bcrypt_executor is None:
+        if BCRYPT_EXECUTOR == "process":
+            _bcrypt_executor = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS)
+        else:
+            _bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+    return _bcrypt_executor
+
+def bcrypt_queue_depth() -> int:
+    """Number of hashing jobs currently queued or running."""
+    return _bcrypt_pending
+
+metrics.gauge("bcrypt_queue_depth", "Password hashing jobs queued or running", bcrypt_queue_depth)
+
+async def _run_bcrypt(func, *args):
+    # Only touched from the event loop thread, so no lock is needed
+    global _bcrypt_pending
+    if _bcrypt_pending >= BCRYPT_MAX_QUEUE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _bcrypt_pending += 1
+    try:
+        # Includes time queued behind other hashes, which is what callers wait for
+        with metrics.timed("bcrypt"):
+            return await asyncio.get_running_loop().run_in_executor(_get_bcrypt_executor(), func, *args)
+    finally:
+        _bcrypt_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the bcrypt pool."""
+    return await _run_bcrypt(hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password on the bcrypt pool."""
+    return await _run_bcrypt(verify_and_update_password, plain_password, hashed_password)
+
+def shutdown_bcrypt_executor() -> None:
+    global _bcrypt_executor
+    if _bcrypt_executor is not None:
+        _bcrypt_executor.shutdown(wait=False)
+        _bcrypt_executor = None
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT token with expiration."""
@@ -39,35 +110,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User:
-    """Decode JWT and return current user."""
-    credentials_exception = HTTPException(
+class TokenCache:
+    """Bounded LRU of verified tokens -> resolved user.
+
+    Each entry expires at its token's `exp`; entries for a user are dropped
+    whenever that user's record changes.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, models.User]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[models.User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, expires_at: float, user: models.User) -> None:
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        """Drop every entry for a user (or everything, for user_id=None)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                return
+            stale = [token for token, (_, user) in self._entries.items() if user.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+utils.user_repository.add_listener(token_cache.invalidate_user)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User:
+    """Decode JWT and return current user (cached tokens never leave the event loop)."""
+    # Drops cached tokens if another worker changed a user (a shared-memory read otherwise)
+    await utils.user_repository.ensure_fresh_async()
+    # Tokens seen before skip the signature check and model construction
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with metrics.timed("jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
 
-    # Find user in users.json
-    users = utils.load_users()
-    user_dict = next((u for u in users if u["username"] == username), None)
+    # Find user by username (in-memory index over users.json, or a query)
+    user_dict = await utils.user_repository.get_by_username_async(username)
     if not user_dict:
-        raise credentials_exception
+        raise _credentials_exception()
 
-    return models.User(**user_dict)
+    user = models.User(**user_dict)
+    # Tokens without an expiry are not cached
+    if payload.get("exp") is not None:
+        token_cache.put(token, payload["exp"], user)
+    return user
 
 
 # Role-based access control dependencies
 def require_role(required_role: UserRole):
     """Dependency to require specific role."""
-    def role_checker(current_user: models.User = Depends(get_current_user)):
+    async def role_checker(current_user: models.User = Depends(get_current_user)):
         # Define role hierarchy
         role_hierarchy = {
             UserRole.USER: [UserRole.USER],
@@ -85,7 +218,7 @@ def require_role(required_role: UserRole):
 
 
 # Convenience role checkers
-def require_admin(current_user: models.User = Depends(get_current_user)):
+async def require_admin(current_user: models.User = Depends(get_current_user)):
     """Require admin role."""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -94,7 +227,7 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
         )
     return current_user
 
-def require_moderator(current_user: models.User = Depends(get_current_user)):
+async def require_moderator(current_user: models.User = Depends(get_current_user)):
     """Require moderator role or higher."""
     if current_user.role not in [UserRole.MODERATOR, UserRole.ADMIN]:
         raise HTTPException(
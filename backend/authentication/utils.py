@@ -3,11 +3,17 @@
 import os
 import json
 from typing import List, Dict, Any
+from backend import database
+from backend.coherence import generations
+from backend.authentication.repository import SQLiteUserRepository, UserRepository
 from backend.authentication.schemas import UserRole
+from backend.metrics import timed
+from backend.storage import DATA_DIR, atomic_write_json
 
 # Define the path to point to your data directory
-USERS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "users.json")
+USERS_FILE = os.path.join(DATA_DIR, "users.json")
 
+@timed("json_load")
 def load_users() -> List[Dict[str, Any]]:
     """Load all users from users.json. Returns an empty list if file is missing/empty."""
     if not os.path.exists(USERS_FILE):
@@ -24,8 +30,15 @@ def load_users() -> List[Dict[str, Any]]:
             return []
 
 def save_users(users: List[Dict[str, Any]]) -> None:
-    """Save users list back to users.json."""
-    # Ensure data directory exists
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    """Save users list back to users.json (atomically, so readers never see a partial file)."""
+    atomic_write_json(USERS_FILE, users, indent=4)
+
+# Indexed, process-wide view of users.json, or the users table with STORAGE_BACKEND=sqlite;
+# changes made by other workers are announced through the shared "users" generation
+if database.STORAGE_BACKEND == "sqlite":
+    user_repository = SQLiteUserRepository(database.get_database(), generations=generations)
+else:
+    user_repository = UserRepository(USERS_FILE, load_users, save_users, generations=generations)
+
+# Held across check -> write sequences so concurrent writers (in any worker) can't race
+users_lock = user_repository.lock
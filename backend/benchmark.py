@@ -0,0 +1,415 @@
+# backend/benchmark.py
+"""Latency/throughput benchmarks on a synthetic dataset, run from the project root:
+
+    python -m backend.benchmark [--movies N --reviews M --users U --votes V] [--concurrency C]
+
+The app runs in-process behind httpx's ASGI transport, or against a
+server started with DATA_DIR pointing at --data-dir (--url). Results are
+written as JSON so runs on different commits can be compared (--baseline).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+
+PASSWORD = "benchmark-password"
+REVIEW_HEADER = ["Date of Review", "User", "Usefulness Vote", "Total Votes", "User's Rating out of 10", "Review Title", "Review"]
+GENRES = ["Action", "Adventure", "Comedy", "Crime", "Drama", "Fantasy", "Horror", "Romance", "Sci-Fi", "Thriller"]
+WORDS = (
+    "film story acting plot scene character director music camera ending twist performance "
+    "script dialogue pacing visual effects drama action comedy romance hero villain sequel "
+    "classic brilliant boring slow beautiful dark funny moving predictable stunning weak strong"
+).split()
+
+# name -> (method, needs a token, writes user data)
+SCENARIOS = {
+    "movies_list": ("GET", False, False),
+    "movie_reviews": ("GET", False, False),
+    "movie_reviews_helpful": ("GET", False, False),
+    "auth_login": ("POST", False, False),
+    "auth_me": ("GET", True, False),
+    "submit_review": ("POST", True, True),
+    "vote_review": ("POST", True, True),
+    "watchlist_add": ("POST", True, True),
+    "watchlist_remove": ("DELETE", True, True),
+    "report_review": ("POST", True, True),
+}
+
+
+class SyntheticDataset:
+    """Deterministic dataset description; the same parameters give the same ids"""
+
+    def __init__(self, movies: int, reviews: int, users: int, votes: int, seed: int = 0):
+        self.movie_count = movies
+        self.reviews_per_movie = reviews
+        self.user_count = users
+        self.vote_count = votes
+        self.seed = seed
+        self.movie_ids = [f"Synthetic Movie {i:05d}" for i in range(movies)]
+        self.usernames = [f"bench_user_{i}" for i in range(1, users + 1)]
+        # User u (1-based) has reviewed movie (u - 1) % movies as user_review_u
+        self.user_reviews = [(f"user_review_{u}", u, self.movie_ids[(u - 1) % movies]) for u in range(1, users + 1)]
+        self.votes = self._seed_votes()
+
+    def _seed_votes(self) -> Set[Tuple[str, int]]:
+        rng = random.Random(self.seed)
+        possible = self.user_count * (self.user_count - 1)
+        target = min(self.vote_count, possible)
+        votes: Set[Tuple[str, int]] = set()
+        while len(votes) < target:
+            review_id, author, _ = rng.choice(self.user_reviews)
+            voter = rng.randint(1, self.user_count)
+            if voter != author:
+                votes.add((review_id, voter))
+        return votes
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    def write(self, data_dir: str, password_hash: str) -> None:
+        """Lay out movie_list/, users.json and user_data.json under data_dir"""
+        rng = random.Random(self.seed)
+        movie_dir = os.path.join(data_dir, "movie_list")
+        os.makedirs(movie_dir, exist_ok=True)
+        for i, movie_id in enumerate(self.movie_ids):
+            folder = os.path.join(movie_dir, movie_id)
+            os.makedirs(folder, exist_ok=True)
+            metadata = {
+                "title": movie_id,
+                "movieIMDbRating": round(rng.uniform(1, 10), 1),
+                "totalRatingCount": rng.randint(0, 2_000_000),
+                "totalUserReviews": str(self.reviews_per_movie),
+                "totalCriticReviews": str(rng.randint(0, 500)),
+                "metaScore": str(rng.randint(1, 100)),
+                "movieGenres": rng.sample(GENRES, 2),
+                "directors": [f"Director {i % 97}"],
+                "datePublished": f"{1950 + i % 75}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                "creators": [f"Writer {i % 89}"],
+                "mainStars": [f"Star {(i + k) % 211}" for k in range(3)],
+                "description": self._text(rng, 30),
+                "duration": rng.randint(80, 180),
+            }
+            with open(os.path.join(folder, "metadata.json"), "w", encoding="utf-8") as f:
+                json.dump(metadata, f)
+            if not self.reviews_per_movie:
+                continue
+            with open(os.path.join(folder, "movieReviews.csv"), "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(REVIEW_HEADER)
+                for r in range(self.reviews_per_movie):
+                    total = rng.randint(0, 500)
+                    writer.writerow([
+                        f"{1 + r % 28} March {2000 + r % 24}", f"reviewer{r}", rng.randint(0, total), total,
+                        rng.randint(1, 10), self._text(rng, 6), self._text(rng, rng.randint(40, 200)),
+                    ])
+
+        users = [
+            {"id": u, "username": name, "email": f"{name}@example.com", "hashed_password": password_hash, "role": "user"}
+            for u, name in enumerate(self.usernames, start=1)
+        ]
+        with open(os.path.join(data_dir, "users.json"), "w") as f:
+            json.dump(users, f)
+
+        helpful: Dict[str, int] = {}
+        for review_id, _ in self.votes:
+            helpful[review_id] = helpful.get(review_id, 0) + 1
+        user_reviews = [
+            {
+                "id": review_id, "movie_id": movie_id, "user_id": u, "username": self.usernames[u - 1],
+                "date_of_review": "01 January 2024", "usefulness_vote": 0, "total_votes": 0,
+                "rating": 1 + u % 10, "review_title": self._text(rng, 5), "review_text": self._text(rng, 80),
+                "helpful_votes": helpful.get(review_id, 0), "is_dataset_review": False,
+                "created_at": "2024-01-01T00:00:00",
+            }
+            for review_id, u, movie_id in self.user_reviews
+        ]
+        user_data = {
+            "user_reviews": user_reviews,
+            "watchlists": {},
+            "review_votes": {f"{voter}_{review_id}": True for review_id, voter in sorted(self.votes)},
+            "reports": [],
+            "penalties": {},
+        }
+        with open(os.path.join(data_dir, "user_data.json"), "w") as f:
+            json.dump(user_data, f)
+
+    def fresh_pairs(self, taken: Set[Tuple[Any, int]], keys: List[Any]) -> Iterator[Tuple[Any, int]]:
+        """(key, user id) pairs not in `taken`, spread across users first"""
+        for key in keys:
+            for user_id in range(1, self.user_count + 1):
+                if (key, user_id) not in taken:
+                    yield key, user_id
+
+
+def build_requests(dataset: SyntheticDataset, name: str) -> Iterator[Tuple[str, str, Dict[str, Any], Optional[int]]]:
+    """Endless (or, for writes, exhausting) stream of (method, path, httpx kwargs, user id) for a scenario"""
+    method = SCENARIOS[name][0]
+    movies = dataset.movie_ids
+    review_ids = [review_id for review_id, _, _ in dataset.user_reviews]
+    authors = {review_id: u for review_id, u, _ in dataset.user_reviews}
+    i = 0
+    if name == "movies_list":
+        while True:
+            yield method, "/movies/", {}, None
+    elif name == "movie_reviews":
+        while True:
+            yield method, f"/movies/{movies[i % len(movies)]}/reviews", {"params": {"limit": 50}}, None
+            i += 1
+    elif name == "movie_reviews_helpful":
+        while True:
+            params = {"sort": "helpful", "limit": 20}
+            yield method, f"/movies/{movies[i % len(movies)]}/reviews", {"params": params}, None
+            i += 1
+    elif name == "auth_login":
+        while True:
+            form = {"username": dataset.usernames[i % dataset.user_count], "password": PASSWORD}
+            yield method, "/auth/login", {"data": form}, None
+            i += 1
+    elif name == "auth_me":
+        while True:
+            yield method, "/auth/me", {}, 1 + i % dataset.user_count
+            i += 1
+    elif name == "submit_review":
+        taken = {(movie_id, u) for _, u, movie_id in dataset.user_reviews}
+        for movie_id, u in dataset.fresh_pairs(taken, movies):
+            body = {"movie_id": movie_id, "rating": 1 + u % 10, "review_title": "Benchmark", "review_text": "Synthetic review"}
+            yield method, f"/movies/{movie_id}/reviews", {"json": body}, u
+    elif name == "vote_review":
+        taken = set(dataset.votes) | {(review_id, u) for review_id, u in authors.items()}
+        for review_id, u in dataset.fresh_pairs(taken, review_ids):
+            yield method, f"/movies/reviews/{review_id}/vote", {"params": {"helpful": "true"}}, u
+    elif name in ("watchlist_add", "watchlist_remove"):
+        # Remove runs after add and takes back the same entries
+        for movie_id, u in dataset.fresh_pairs(set(), movies):
+            yield method, f"/movies/{movie_id}/watchlist", {}, u
+    elif name == "report_review":
+        for review_id, u in dataset.fresh_pairs(set(), review_ids):
+            body = {"review_id": review_id, "reason": "benchmark"}
+            yield method, f"/movies/reviews/{review_id}/report", {"json": body}, u
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], wall: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def ms(seconds: float) -> float:
+        return round(seconds * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "statuses": statuses,
+        "throughput_rps": round(len(ordered) / wall, 1) if wall else 0.0,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p90_ms": ms(percentile(ordered, 90)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, requests: Iterator, count: int, concurrency: int,
+                       token: Callable[[int], str]) -> Dict[str, Any]:
+    """Send up to `count` requests from `concurrency` workers sharing one request stream"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < count:
+            request = next(requests, None)
+            if request is None:
+                return
+            sent += 1
+            method, path, kwargs, user_id = request
+            headers = {"Authorization": f"Bearer {token(user_id)}"} if user_id is not None else {}
+            start = time.perf_counter()
+            response = await client.request(method, path, headers=headers, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+async def run_benchmarks(client: httpx.AsyncClient, dataset: SyntheticDataset, args: argparse.Namespace,
+                         token: Callable[[int], str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in args.scenarios:
+        requests = build_requests(dataset, name)
+        if args.warmup and not SCENARIOS[name][2]:
+            await run_scenario(client, requests, args.warmup, args.concurrency, token)
+        count = args.login_requests if name == "auth_login" else args.requests
+        results[name] = await run_scenario(client, requests, count, args.concurrency, token)
+        print(format_result(name, results[name]), file=sys.stderr)
+    return results
+
+
+def format_result(name: str, result: Dict[str, Any]) -> str:
+    statuses = " ".join(f"{code}x{n}" for code, n in sorted(result["statuses"].items()))
+    return (f"{name:<22} n={result['requests']:<6} p50={result['p50_ms']:>9.3f}ms p99={result['p99_ms']:>9.3f}ms "
+            f"{result['throughput_rps']:>9.1f} req/s  [{statuses}]")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change in p50/p99/throughput against an earlier results file"""
+    print(f"vs {baseline['meta'].get('commit') or 'baseline'}:", file=sys.stderr)
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("p50_ms", "p99_ms", "throughput_rps"):
+            if before[key]:
+                changes.append(f"{key} {100 * (result[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {name:<18} " + "  ".join(changes), file=sys.stderr)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_environment(args: argparse.Namespace, data_dir: str) -> None:
+    # Read by the backend modules at import time, so set before importing them
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["STORAGE_BACKEND"] = args.storage
+    os.environ.pop("SQLITE_PATH", None)
+    os.environ.setdefault("DATASET_WARMUP", "1")
+
+
+def generate(dataset: SyntheticDataset, args: argparse.Namespace, data_dir: str) -> None:
+    from backend.authentication import security
+
+    started = time.perf_counter()
+    dataset.write(data_dir, security.hash_password(PASSWORD))
+    if args.storage == "sqlite":
+        from backend import cli
+        cli.main(["migrate-to-sqlite"])
+    print(f"Generated {dataset.movie_count} movies x {dataset.reviews_per_movie} reviews, {dataset.user_count} users, "
+          f"{len(dataset.votes)} votes in {data_dir} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+
+async def benchmark(dataset: SyntheticDataset, args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        from jose import jwt
+        secret = os.environ.get("SECRET_KEY", "devsecretkey")
+        make_token = lambda user_id: jwt.encode({"sub": dataset.usernames[user_id - 1]}, secret, algorithm="HS256")
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        lifespan = None
+    else:
+        from backend.app.main import app
+        from backend.authentication import security
+        make_token = lambda user_id: security.create_access_token({"sub": dataset.usernames[user_id - 1]})
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    tokens: Dict[int, str] = {}
+
+    def token(user_id: int) -> str:
+        if user_id not in tokens:
+            tokens[user_id] = make_token(user_id)
+        return tokens[user_id]
+
+    async with client:
+        if lifespan is None:
+            return await run_benchmarks(client, dataset, args, token)
+        async with lifespan:
+            return await run_benchmarks(client, dataset, args, token)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the API on a synthetic dataset")
+    parser.add_argument("--movies", type=int, default=200, help="Movie folders to generate")
+    parser.add_argument("--reviews", type=int, default=200, help="Reviews per movieReviews.csv")
+    parser.add_argument("--users", type=int, default=500, help="Users in users.json (each with one review)")
+    parser.add_argument("--votes", type=int, default=2000, help="Helpful votes on those reviews")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="Requests for auth_login (bcrypt-bound)")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each read scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--data-dir", help="Keep the dataset here instead of a temporary directory")
+    parser.add_argument("--generate-only", action="store_true", help="Write the dataset to --data-dir and exit")
+    parser.add_argument("--url", help="Benchmark a running server (started with DATA_DIR=--data-dir) instead of in-process")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if (args.generate_only or args.url) and not args.data_dir:
+        parser.error("--generate-only and --url need --data-dir")
+    if args.users < 2 or args.movies < 1:
+        parser.error("need at least 1 movie and 2 users")
+
+    dataset = SyntheticDataset(args.movies, args.reviews, args.users, args.votes, args.seed)
+    data_dir = os.path.abspath(args.data_dir) if args.data_dir else tempfile.mkdtemp(prefix="movie-benchmark-")
+    prepare_environment(args, data_dir)
+    try:
+        if not args.url:
+            if args.data_dir and os.path.exists(os.path.join(data_dir, "users.json")) and not args.generate_only:
+                print(f"Reusing dataset in {data_dir}", file=sys.stderr)
+            else:
+                generate(dataset, args, data_dir)
+            if args.generate_only:
+                return 0
+        results = asyncio.run(benchmark(dataset, args))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "http" if args.url else "asgi",
+            "storage": args.storage,
+            "concurrency": args.concurrency,
+            "dataset": {"movies": args.movies, "reviews": args.reviews, "users": args.users,
+                        "votes": len(dataset.votes), "seed": args.seed},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results -> {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# backend/cli.py
+"""Maintenance commands, run from the project root: python -m backend.cli <command>"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from backend import database
+from backend.coherence import generations
+from backend.authentication import utils as auth_utils
+from backend.authentication.repository import SQLiteUserRepository
+from backend.movies import packed, reviews, utils
+from backend.movies.user_data import UserDataStore
+from backend.movies.user_data_sqlite import SQLiteUserDataStore
+
+
+def build_review_indexes(args: argparse.Namespace) -> int:
+    """Build (or rebuild) the byte-offset sidecar for every movieReviews.csv"""
+    for movie in utils.load_all_movies():
+        path = reviews.reviews_file(utils.MOVIES_DATA_DIR, movie["id"])
+        if not os.path.exists(path):
+            continue
+        index = reviews.get_review_index(path, rebuild=args.force)
+        print(f"{movie['id']}: {len(index)} reviews")
+    return 0
+
+
+def build_search_index(args: argparse.Namespace) -> int:
+    """Rebuild the full-text review search index"""
+    index = utils.get_review_search_index(rebuild=True)
+    print(f"Indexed {len(index)} reviews, {len(index.postings)} terms -> {index.path}")
+    return 0
+
+
+def rebuild_user_stats(args: argparse.Namespace) -> int:
+    """Recompute per-user review/watchlist counters and store them in a fresh snapshot"""
+    stats = utils.user_data_store.rebuild_user_stats()
+    utils.user_data_store.snapshot()
+    utils.user_data_store.close()
+    print(f"Rebuilt stats for {len(stats)} users -> {utils.user_data_store.snapshot_path}")
+    return 0
+
+
+def compile_dataset(args: argparse.Namespace) -> int:
+    """Compile movie_list into the packed dataset the API reads from"""
+    output = args.output or utils.PACKED_DATASET_FILE
+    try:
+        summary = packed.compile_dataset(utils.MOVIES_DATA_DIR, output)
+    except ValueError as e:
+        print(f"Compile failed: {e}", file=sys.stderr)
+        return 1
+    # Running workers switch to the new pack on their next request
+    generations.bump("catalog")
+    print(f"Packed {summary['movies']} movies, {summary['reviews']} reviews ({summary['bytes']} bytes) -> {output}")
+    return 0
+
+
+def ingest_dataset(args: argparse.Namespace) -> int:
+    """Validate every movie folder in parallel and report problems per folder"""
+    report = utils.ingest_dataset(workers=args.workers, seed=args.build_indexes)
+    if args.json:
+        print(json.dumps({"summary": report.summary(), "errors": report.errors}, indent=2))
+    else:
+        for error in report.errors:
+            line = f":{error['line']}" if error["line"] else ""
+            print(f"{error['movie_id']}/{error['file']}{line}: {error['message']}")
+        summary = report.summary()
+        print(f"{summary['movies']}/{summary['folders']} movies, {summary['reviews']} reviews, {summary['errors']} errors")
+    return 1 if report.errors else 0
+
+
+def migrate_to_sqlite(args: argparse.Namespace) -> int:
+    """Copy users.json and user data (snapshot + log) into the SQLite database"""
+    users = auth_utils.load_users()
+    json_store = UserDataStore(utils.USER_DATA_FILE, utils.USER_DATA_LOG_FILE)
+    data = json_store.data
+    json_store.close()
+
+    db = database.Database(args.sqlite_path or database.SQLITE_PATH)
+    added_users = SQLiteUserRepository(db).import_users(users)
+    counts = SQLiteUserDataStore(db).import_data(data)
+    db.checkpoint()
+    db.close()
+    print(f"Migrated {added_users}/{len(users)} users -> {db.path}")
+    print(", ".join(f"{name}: {n}" for name, n in counts.items()))
+    if counts["skipped"]:
+        print("Skipped rows already present or violating a unique constraint", file=sys.stderr)
+    print("Set STORAGE_BACKEND=sqlite to serve from the database")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("build-review-indexes", help="Index review CSVs by row offset")
+    index_parser.add_argument("--force", action="store_true", help="Rebuild even if the index is current")
+    index_parser.set_defaults(func=build_review_indexes)
+
+    search_parser = subparsers.add_parser("build-search-index", help="Rebuild the review full-text index")
+    search_parser.set_defaults(func=build_search_index)
+
+    stats_parser = subparsers.add_parser("rebuild-user-stats", help="Recompute per-user review counters")
+    stats_parser.set_defaults(func=rebuild_user_stats)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Validate movie_list across a process pool")
+    ingest_parser.add_argument("--workers", type=int, help="Worker processes (default INGEST_WORKERS or one per CPU)")
+    ingest_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    ingest_parser.add_argument("--build-indexes", action="store_true", help="Also write review offset sidecars")
+    ingest_parser.set_defaults(func=ingest_dataset)
+
+    compile_parser = subparsers.add_parser("compile-dataset", help="Pack movie_list into one memory-mapped file")
+    compile_parser.add_argument("--output", help=f"Output path (default {utils.PACKED_DATASET_FILE})")
+    compile_parser.set_defaults(func=compile_dataset)
+
+    migrate_parser = subparsers.add_parser("migrate-to-sqlite", help="Copy the JSON stores into SQLite")
+    migrate_parser.add_argument("--sqlite-path", help=f"Database file (default {database.SQLITE_PATH})")
+    migrate_parser.set_defaults(func=migrate_to_sqlite)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
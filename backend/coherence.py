@@ -0,0 +1,119 @@
+# backend/coherence.py
+"""Change counters shared by every worker process on a host, so in-memory caches know when to reload."""
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Optional, Sequence
+
+from backend.storage import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking (e.g. Windows); fine for a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Small file mapped by every worker; /dev/shm works too, it only has to be shared
+COHERENCE_FILE = os.environ.get("COHERENCE_FILE", os.path.join(DATA_DIR, ".generations"))
+
+# One counter per independently cached partition; append new ones at the end
+PARTITIONS = ("catalog", "users", "user_data", "user_data_snapshot", "user_reviews")
+_SLOT = struct.Struct("<Q")
+_FILE_SLOTS = 64
+
+
+class PartitionLock:
+    """A thread RLock plus a POSIX byte-range lock on one slot of the generations file.
+
+    Byte-range locks belong to the process, so the RLock keeps threads of
+    one process out of each other's way and the range lock is only taken
+    (and released) by the outermost acquisition.
+    """
+
+    def __init__(self, generations: "Generations", offset: int):
+        self._generations = generations
+        self._offset = offset
+        self._rlock = threading.RLock()
+        self._depth = 0
+
+    def __enter__(self) -> "PartitionLock":
+        self._rlock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._generations._map()
+                fcntl.lockf(self._generations._fd, fcntl.LOCK_EX, _SLOT.size, self._offset)
+            except BaseException:
+                self._rlock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        try:
+            if self._depth == 0 and fcntl is not None:
+                fcntl.lockf(self._generations._fd, fcntl.LOCK_UN, _SLOT.size, self._offset)
+        finally:
+            self._rlock.release()
+
+
+class Generations:
+    """Per-partition generation numbers in a memory-mapped file.
+
+    A worker that commits a change bumps its partition's number; readers
+    compare the number with the one they loaded at, which is a read from
+    shared memory, so it is cheap enough to do on every request. Each
+    partition also has a cross-process lock (a byte-range lock on its slot)
+    for check-then-write sequences that must not interleave between workers.
+    """
+
+    def __init__(self, path: str, partitions: Sequence[str] = PARTITIONS):
+        self.path = path
+        self.offsets = {name: i * _SLOT.size for i, name in enumerate(partitions)}
+        self._mm: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._open_lock = threading.Lock()
+        self._locks = {name: PartitionLock(self, offset) for name, offset in self.offsets.items()}
+
+    def _map(self) -> mmap.mmap:
+        if self._mm is None:
+            with self._open_lock:
+                if self._mm is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    size = _FILE_SLOTS * _SLOT.size
+                    if os.fstat(fd).st_size < size:
+                        # Growing with ftruncate zero-fills, so racing workers agree on the result
+                        os.ftruncate(fd, size)
+                    self._fd = fd
+                    self._mm = mmap.mmap(fd, size)
+        return self._mm
+
+    def get(self, partition: str) -> int:
+        return _SLOT.unpack_from(self._map(), self.offsets[partition])[0]
+
+    def lock(self, partition: str) -> "PartitionLock":
+        """The partition's lock: exclusive across threads and processes, re-entrant within a thread"""
+        return self._locks[partition]
+
+    def bump(self, partition: str) -> int:
+        """Record a committed change to `partition`; returns the new generation"""
+        with self.lock(partition):
+            generation = self.get(partition) + 1
+            _SLOT.pack_into(self._map(), self.offsets[partition], generation)
+        logger.debug("%s generation -> %d", partition, generation)
+        return generation
+
+    def close(self) -> None:
+        with self._open_lock:
+            if self._mm is not None:
+                self._mm.close()
+                os.close(self._fd)
+                self._mm = self._fd = None
+
+
+# Shared by the stores and caches of this process
+generations = Generations(COHERENCE_FILE)
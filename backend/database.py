@@ -0,0 +1,175 @@
+# backend/database.py
+"""Optional SQLite persistence for users and user data (STORAGE_BACKEND=sqlite)."""
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from backend.storage import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# "json" (users.json + user_data.json/log) or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(DATA_DIR, "app.db"))
+# Milliseconds a writer waits for another process's write lock
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user'
+);
+
+CREATE TABLE IF NOT EXISTS user_reviews (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    movie_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    date_of_review TEXT NOT NULL,
+    usefulness_vote INTEGER NOT NULL DEFAULT 0,
+    total_votes INTEGER NOT NULL DEFAULT 0,
+    rating INTEGER NOT NULL,
+    review_title TEXT NOT NULL,
+    review_text TEXT NOT NULL,
+    helpful_votes INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    UNIQUE (movie_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS user_reviews_by_user ON user_reviews (user_id);
+
+CREATE TABLE IF NOT EXISTS review_votes (
+    review_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    helpful INTEGER NOT NULL,
+    PRIMARY KEY (review_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS watchlists (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    movie_id TEXT NOT NULL,
+    added_at TEXT NOT NULL,
+    movie_title TEXT,
+    UNIQUE (user_id, movie_id)
+);
+
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    username TEXT,
+    reason TEXT,
+    reported_at TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    UNIQUE (review_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS penalties (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+-- Single counters, e.g. the user-data change sequence
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class Database:
+    """One SQLite file shared by every thread, with a connection per thread.
+
+    Connections run in WAL mode, so readers never block the single writer
+    and separate processes can write to the same file. Queries are
+    parameterized, so each connection's statement cache keeps them
+    prepared.
+    """
+
+    def __init__(self, path: str, busy_timeout: int = SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with self._lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def in_transaction(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE ... COMMIT on this thread's connection; nested calls join the outer one.
+
+        IMMEDIATE takes the write lock up front, so a check made inside the
+        transaction still holds when the write happens, across processes too.
+        """
+        conn = self.connection
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            conn.execute("COMMIT")
+
+    def checkpoint(self) -> None:
+        """Fold the WAL back into the main database file"""
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._local = threading.local()
+
+
+_database: Optional[Database] = None
+_database_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """The process-wide Database at SQLITE_PATH"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = Database(SQLITE_PATH)
+    return _database
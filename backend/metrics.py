@@ -0,0 +1,261 @@
+# backend/metrics.py
+"""In-process metrics in Prometheus text format, timing hooks and an opt-in sampling profiler."""
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Serve /metrics and record request/operation timings
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# Start the sampling profiler at startup (it can also be toggled at runtime)
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+# Seconds between profiler samples
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", "0.01"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[LabelValues, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """A value read from a callback when metrics are rendered"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, func: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def samples(self) -> Iterator[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.warning("Gauge %s failed: %s", self.name, e)
+            return
+        yield f"{self.name} {_number(value)}"
+
+
+_registry: List = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name: str, help: str, func: Callable[[], float]) -> Gauge:
+    return register(Gauge(name, help, func))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+http_requests = register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"),
+))
+http_request_duration = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"),
+))
+operation_duration = register(Histogram(
+    "operation_duration_seconds", "Time spent in instrumented hot paths", ("operation",),
+))
+operation_errors = register(Counter(
+    "operation_errors_total", "Instrumented operations that raised", ("operation",),
+))
+_started = time.monotonic()
+gauge("process_uptime_seconds", "Seconds since this process imported its metrics", lambda: time.monotonic() - _started)
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    """Record how long the block (or decorated function) takes as operation_duration_seconds{operation}"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        operation_errors.inc(operation)
+        raise
+    finally:
+        operation_duration.observe(time.perf_counter() - start, operation)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack on a timer and counts collapsed stacks.
+
+    Output is the "folded" format (frame;frame;frame count per line) read
+    by flamegraph.pl and speedscope. Request threads are not instrumented;
+    the only cost is the sampler walking their stacks while it runs.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: _StackCounter = _StackCounter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info("Sampling profiler started (every %.3fs)", self.interval)
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            logger.info("Sampling profiler stopped after %d samples", self.samples)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks = _StackCounter()
+            self.samples = 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def folded(self) -> str:
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "started_at": self.started_at,
+        }
+
+
+profiler = SamplingProfiler()
+gauge("profiler_running", "1 while the sampling profiler is collecting", lambda: int(profiler.running))
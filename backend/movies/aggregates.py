@@ -0,0 +1,128 @@
+# backend/movies/aggregates.py
+import csv
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from backend.metrics import timed
+from .reviews import RATING_COLUMN, parse_rating, reviews_file
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewAggregate:
+    """Running totals over a set of reviews, updated in O(1) per review or vote.
+
+    Ratings outside 1-10 (unparseable in the dataset) count as reviews but
+    are left out of the average and histogram.
+    """
+
+    __slots__ = ("review_count", "rated_count", "rating_sum", "histogram", "usefulness_votes")
+
+    def __init__(self):
+        self.review_count = 0
+        self.rated_count = 0
+        self.rating_sum = 0
+        self.histogram = [0] * 10
+        self.usefulness_votes = 0
+
+    def add_review(self, rating: int, usefulness_votes: int = 0) -> None:
+        self.review_count += 1
+        if 1 <= rating <= 10:
+            self.rated_count += 1
+            self.rating_sum += rating
+            self.histogram[rating - 1] += 1
+        self.usefulness_votes += usefulness_votes
+
+    def add_votes(self, votes: int = 1) -> None:
+        self.usefulness_votes += votes
+
+    def merged(self, other: "ReviewAggregate") -> "ReviewAggregate":
+        result = ReviewAggregate()
+        result.review_count = self.review_count + other.review_count
+        result.rated_count = self.rated_count + other.rated_count
+        result.rating_sum = self.rating_sum + other.rating_sum
+        result.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        result.usefulness_votes = self.usefulness_votes + other.usefulness_votes
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "review_count": self.review_count,
+            "average_rating": round(self.rating_sum / self.rated_count, 2) if self.rated_count else 0.0,
+            "rating_histogram": {str(i + 1): n for i, n in enumerate(self.histogram)},
+            "usefulness_votes": self.usefulness_votes,
+        }
+
+
+@timed("csv_parse")
+def compute_dataset_aggregate(path: str) -> ReviewAggregate:
+    """One pass over a review CSV, reading only the numeric columns"""
+    aggregate = ReviewAggregate()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return aggregate
+        rating_col = header.index(RATING_COLUMN)
+        votes_col = header.index("Usefulness Vote")
+        for row in reader:
+            if row:
+                aggregate.add_review(parse_rating(row[rating_col]), int(row[votes_col]))
+    return aggregate
+
+
+def aggregate_columns(ratings: Iterable[int], usefulness_votes: Iterable[int]) -> ReviewAggregate:
+    """Aggregate from already-parsed numeric columns (e.g. a packed dataset)"""
+    aggregate = ReviewAggregate()
+    for rating, votes in zip(ratings, usefulness_votes):
+        aggregate.add_review(rating, votes)
+    return aggregate
+
+
+class DatasetAggregates:
+    """Aggregates of each movie's review CSV, computed once per CSV version"""
+
+    def __init__(self, data_dir: str, packed=None):
+        self.data_dir = data_dir
+        self.packed = packed
+        self._cache: Dict[str, Tuple[Tuple[int, int], ReviewAggregate]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, movie_id: str, size: int, mtime_ns: int, aggregate: ReviewAggregate) -> None:
+        """Record an aggregate computed elsewhere for the CSV version (size, mtime_ns)"""
+        with self._lock:
+            self._cache[movie_id] = ((size, mtime_ns), aggregate)
+
+    def cached(self, movie_id: str, size: int, mtime_ns: int) -> Optional[ReviewAggregate]:
+        """The aggregate for that CSV version if it is already computed, without touching disk"""
+        cached = self._cache.get(movie_id)
+        if cached is not None and cached[0] == (size, mtime_ns):
+            return cached[1]
+        return None
+
+    def get(self, movie_id: str) -> ReviewAggregate:
+        path = reviews_file(self.data_dir, movie_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return ReviewAggregate()
+        stamp = (stat.st_size, stat.st_mtime_ns)
+
+        cached = self._cache.get(movie_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        columns = self.packed.review_columns(movie_id, (stat.st_mtime_ns, stat.st_size)) if self.packed else None
+        try:
+            if columns is not None:
+                aggregate = aggregate_columns(columns["rating"], columns["usefulness_vote"])
+            else:
+                aggregate = compute_dataset_aggregate(path)
+        except Exception as e:
+            logger.warning("Error aggregating reviews for %s: %s", movie_id, e)
+            aggregate = ReviewAggregate()
+        with self._lock:
+            self._cache[movie_id] = (stamp, aggregate)
+        return aggregate
@@ -0,0 +1,260 @@
+# backend/movies/catalog.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.metrics import timed
+from .reviews import reviews_file
+
+logger = logging.getLogger(__name__)
+
+# Seconds between automatic mtime checks of movie_list (0 disables them,
+# leaving only explicit reloads)
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("CATALOG_REFRESH_INTERVAL", "5"))
+
+
+class MovieCatalog:
+    """Process-wide movie catalog keyed by movie id (the folder name).
+
+    Metadata is loaded once and kept in memory. A refresh only re-reads the
+    folders whose metadata.json changed size or mtime since the last scan.
+    Each scan also records the review CSV stamps, so response validators
+    can be computed without going to disk. With `generations`, a reload
+    announced by another worker (see reload()) is noticed on the next
+    access instead of after the refresh interval.
+
+    Only the first load happens in the caller. Later rescans run on a
+    background thread while readers keep the last installed snapshot, so
+    a lookup from an async handler never waits for a directory scan.
+    """
+
+    def __init__(self, data_dir: str, refresh_interval: float = CATALOG_REFRESH_INTERVAL, packed=None,
+                 generations=None):
+        self.data_dir = data_dir
+        self.generations = generations
+        self._generation = None
+        self.refresh_interval = refresh_interval
+        # Optional PackedDataset; its compiled metadata replaces unchanged metadata.json reads
+        self.packed = packed
+        self.version = 0
+        self._movies: Dict[str, Dict[str, Any]] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._review_stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        # metadata.json stamps that failed validation at ingest; skipped until the file changes
+        self._rejected: Dict[str, Tuple[int, int]] = {}
+        self.fingerprint = ""
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rescan movie_list, reloading changed folders (all of them if force). Returns True if anything changed."""
+        with self._lock:
+            changed = self._refresh(force)
+        if changed:
+            self._notify()
+        return changed
+
+    def _refresh(self, force: bool) -> bool:
+        # Caller holds _lock
+        if self.generations is not None:
+            self._generation = self.generations.get("catalog")
+        if self.packed is not None:
+            self.packed.refresh()
+        with timed("catalog_load"):
+            movies, stamps, changed = self._scan(force)
+            review_stamps = {movie_id: self._stat_reviews(movie_id) for movie_id in movies}
+        self._install(movies, stamps, review_stamps, changed)
+        return changed
+
+    def reload(self) -> None:
+        """Re-read every folder and have the other workers rescan too"""
+        self.refresh(force=True)
+        if self.generations is not None:
+            with self._lock:
+                self._generation = self.generations.bump("catalog")
+
+    def seed(
+        self,
+        movies: Dict[str, Dict[str, Any]],
+        stamps: Dict[str, Tuple[int, int]],
+        review_stamps: Dict[str, Optional[Tuple[int, int]]],
+        rejected: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> None:
+        """Install metadata that was loaded elsewhere (see ingest.py) instead of scanning.
+
+        Folders in `rejected` (movie_id -> metadata.json stamp) stay out of
+        the catalog, and later scans skip them while the stamp is unchanged.
+        """
+        with self._lock:
+            self._rejected = dict(rejected or {})
+            # Seeding counts as a load: without this the first access would rescan
+            if self.generations is not None:
+                self._generation = self.generations.get("catalog")
+            if self.packed is not None:
+                self.packed.refresh()
+            self._install(dict(movies), dict(stamps), dict(review_stamps), True)
+        self._notify()
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call `callback()` after each change is installed, in the thread that installed it (e.g. to rebuild indexes)"""
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Catalog listener %r failed", callback)
+
+    def _install(self, movies, stamps, review_stamps, changed: bool) -> None:
+        # Caller holds _lock
+        self._movies = movies
+        self._stamps = stamps
+        self._review_stamps = review_stamps
+        self.fingerprint = self._fingerprint(stamps, review_stamps)
+        self._loaded = True
+        self._checked_at = time.monotonic()
+        if changed:
+            self.version += 1
+
+    def _scan(self, force: bool):
+        movies: Dict[str, Dict[str, Any]] = {}
+        stamps: Dict[str, Tuple[int, int]] = {}
+
+        if not os.path.isdir(self.data_dir):
+            logger.warning("Movie directory not found: %s", os.path.abspath(self.data_dir))
+            return movies, stamps, bool(self._movies)
+
+        changed = False
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+
+                movie_id = entry.name
+                metadata_file = os.path.join(entry.path, "metadata.json")
+                try:
+                    stat = os.stat(metadata_file)
+                except FileNotFoundError:
+                    logger.debug("No metadata.json in %s", movie_id)
+                    continue
+
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if movie_id in self._rejected:
+                    if self._rejected[movie_id] == stamp:
+                        continue
+                    del self._rejected[movie_id]
+                if not force and self._stamps.get(movie_id) == stamp:
+                    movies[movie_id] = self._movies[movie_id]
+                    stamps[movie_id] = stamp
+                    continue
+
+                metadata = self.packed.metadata(movie_id, stamp) if self.packed is not None else None
+                if metadata is None:
+                    try:
+                        with open(metadata_file, "r", encoding="utf-8") as f:
+                            metadata = json.load(f)
+                    except Exception as e:
+                        logger.warning("Error loading %s: %s", movie_id, e)
+                        continue
+
+                metadata["id"] = movie_id
+                movies[movie_id] = metadata
+                stamps[movie_id] = stamp
+                changed = True
+
+        if movies.keys() != self._movies.keys():
+            changed = True
+        logger.debug("Catalog scan of %s: %d movies", self.data_dir, len(movies))
+        return movies, stamps, changed
+
+    def _stat_reviews(self, movie_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(reviews_file(self.data_dir, movie_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _fingerprint(stamps, review_stamps) -> str:
+        """Digest of every file stamp; changes whenever any metadata or review CSV does."""
+        digest = hashlib.blake2b(digest_size=16)
+        for movie_id in sorted(stamps):
+            digest.update(f"{movie_id}:{stamps[movie_id]}:{review_stamps.get(movie_id)};".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _stale(self) -> bool:
+        if not self._loaded:
+            return True
+        if self.generations is not None and self.generations.get("catalog") != self._generation:
+            return True
+        return self.refresh_interval > 0 and time.monotonic() - self._checked_at >= self.refresh_interval
+
+    def ensure_fresh(self) -> None:
+        """Load on first use, then re-check folder mtimes at most once per refresh interval (in the background)."""
+        if not self._loaded:
+            self._refresh_if_stale()
+        elif not self._refreshing and self._stale():
+            with self._refreshing_lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="catalog-refresh", daemon=True).start()
+
+    def _refresh_if_stale(self) -> None:
+        with self._lock:
+            # Threads that queued behind a rescan find it already done
+            if not self._stale():
+                return
+            changed = self._refresh(False)
+        if changed:
+            self._notify()
+
+    def _background_refresh(self) -> None:
+        try:
+            self._refresh_if_stale()
+        except Exception:
+            logger.exception("Background rescan of %s failed", self.data_dir)
+            # Retry after another interval rather than on the next request
+            self._checked_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def get(self, movie_id: str) -> Optional[Dict[str, Any]]:
+        """O(1) lookup of a movie by id."""
+        self.ensure_fresh()
+        return self._movies.get(movie_id)
+
+    def stamps(self, movie_id: str) -> Optional[Tuple[Tuple[int, int], Optional[Tuple[int, int]]]]:
+        """(metadata stamp, review CSV stamp) as of the last scan, or None for an unknown movie."""
+        self.ensure_fresh()
+        stamp = self._stamps.get(movie_id)
+        if stamp is None:
+            return None
+        return stamp, self._review_stamps.get(movie_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All movies, in directory scan order."""
+        self.ensure_fresh()
+        return list(self._movies.values())
+
+    def __contains__(self, movie_id: str) -> bool:
+        self.ensure_fresh()
+        return movie_id in self._movies
+
+    def __len__(self) -> int:
+        self.ensure_fresh()
+        return len(self._movies)
+
+    @property
+    def count(self) -> int:
+        """Movies in the installed snapshot, without checking for changes (for metrics)"""
+        return len(self._movies)
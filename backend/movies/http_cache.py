@@ -0,0 +1,31 @@
+# backend/movies/http_cache.py
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+# max-age for cacheable read endpoints; with the default of 0 clients
+# revalidate every time and get a 304 when nothing changed
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "0"))
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the version markers a response was built from"""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
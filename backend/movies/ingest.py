@@ -0,0 +1,171 @@
+# backend/movies/ingest.py
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from .aggregates import ReviewAggregate
+from .reviews import (
+    RATING_COLUMN, REVIEWS_FILENAME, ReviewIndex, RowOffsetScanner, header_columns, parse_rating,
+)
+from .schemas import MovieMetadata
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for ingest (0 = one per CPU, 1 = no pool)
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "0"))
+# Row-level problems kept per folder; the rest are only counted
+MAX_ERRORS_PER_FOLDER = 20
+
+REQUIRED_REVIEW_COLUMNS = ("Date of Review", "User", "Usefulness Vote", "Total Votes", RATING_COLUMN, "Review Title")
+
+
+def _error(movie_id: str, file: str, message: str, line: Optional[int] = None) -> Dict[str, Any]:
+    return {"movie_id": movie_id, "file": file, "line": line, "message": message}
+
+
+def _ingest_metadata(folder: str, movie_id: str, result: Dict[str, Any]) -> None:
+    path = os.path.join(folder, "metadata.json")
+    try:
+        stat = os.stat(path)
+        with open(path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        result["errors"].append(_error(movie_id, "metadata.json", "missing"))
+        return
+    except (OSError, ValueError) as e:
+        result["errors"].append(_error(movie_id, "metadata.json", str(e)))
+        return
+
+    # Set even when validation fails, so the catalog can keep skipping this version of the file
+    result["metadata_stamp"] = (stat.st_mtime_ns, stat.st_size)
+    try:
+        MovieMetadata.model_validate(metadata)
+    except ValidationError as e:
+        for problem in e.errors():
+            field = ".".join(str(part) for part in problem["loc"])
+            result["errors"].append(_error(movie_id, "metadata.json", f"{field}: {problem['msg']}"))
+        return
+
+    metadata["id"] = movie_id
+    result["metadata"] = metadata
+
+
+def _ingest_reviews(folder: str, movie_id: str, result: Dict[str, Any]) -> None:
+    path = os.path.join(folder, REVIEWS_FILENAME)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return
+
+    errors = result["errors"]
+    dropped = 0
+    aggregate = ReviewAggregate()
+    count = 0
+    # One read of the file: the row offset index is built from the same
+    # physical lines the csv parser consumes
+    scanner = RowOffsetScanner()
+
+    def lines(f):
+        for line in f:
+            scanner.feed(line)
+            yield line.decode("utf-8")
+
+    try:
+        with open(path, "rb") as f:
+            reader = csv.reader(lines(f))
+            header = next(reader, None)
+            columns = header_columns(header or [])
+            missing = [name for name in REQUIRED_REVIEW_COLUMNS if name not in columns]
+            if missing:
+                errors.append(_error(movie_id, REVIEWS_FILENAME, f"missing columns: {', '.join(missing)}", 1))
+                return
+            for row in reader:
+                if not row:
+                    continue
+                count += 1
+                try:
+                    votes = int(row[columns["Usefulness Vote"]])
+                    int(row[columns["Total Votes"]])
+                    aggregate.add_review(parse_rating(row[columns[RATING_COLUMN]]), votes)
+                except (IndexError, ValueError) as e:
+                    if len(errors) < MAX_ERRORS_PER_FOLDER:
+                        errors.append(_error(movie_id, REVIEWS_FILENAME, str(e), reader.line_num))
+                    else:
+                        dropped += 1
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        errors.append(_error(movie_id, REVIEWS_FILENAME, str(e)))
+        return
+
+    offsets = scanner.finish()
+    if len(offsets) - 1 != count:
+        errors.append(_error(
+            movie_id, REVIEWS_FILENAME,
+            f"row offset scan found {len(offsets) - 1} records, csv parser found {count}",
+        ))
+    else:
+        result["review_index"] = ReviewIndex(stat.st_size, stat.st_mtime_ns, offsets)
+    result["reviews_stamp"] = (stat.st_mtime_ns, stat.st_size)
+    result["aggregate"] = aggregate
+    result["review_count"] = count
+    result["errors_dropped"] = dropped
+
+
+def ingest_folder(data_dir: str, movie_id: str) -> Dict[str, Any]:
+    """Parse and validate one movie folder (runs in a worker process)"""
+    folder = os.path.join(data_dir, movie_id)
+    result = {
+        "movie_id": movie_id,
+        "metadata": None,
+        "metadata_stamp": None,
+        "reviews_stamp": None,
+        "review_index": None,
+        "aggregate": None,
+        "review_count": 0,
+        "errors": [],
+        "errors_dropped": 0,
+    }
+    _ingest_metadata(folder, movie_id, result)
+    if result["metadata"] is not None:
+        _ingest_reviews(folder, movie_id, result)
+    return result
+
+
+class IngestReport:
+    """Per-folder results of an ingest run"""
+
+    def __init__(self, data_dir: str, results: List[Dict[str, Any]]):
+        self.data_dir = data_dir
+        self.results = results
+
+    @property
+    def errors(self) -> List[Dict[str, Any]]:
+        return [error for result in self.results for error in result["errors"]]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "folders": len(self.results),
+            "movies": sum(1 for r in self.results if r["metadata"] is not None),
+            "reviews": sum(r["review_count"] for r in self.results),
+            "errors": sum(len(r["errors"]) + r["errors_dropped"] for r in self.results),
+            "folders_with_errors": sum(1 for r in self.results if r["errors"]),
+        }
+
+
+def ingest(data_dir: str, workers: int = INGEST_WORKERS) -> IngestReport:
+    """Validate every folder under data_dir, spreading folders across a process pool"""
+    movie_ids = sorted(entry.name for entry in os.scandir(data_dir) if entry.is_dir())
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(movie_ids) <= 1:
+        results = [ingest_folder(data_dir, movie_id) for movie_id in movie_ids]
+    else:
+        chunksize = max(1, len(movie_ids) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=min(workers, len(movie_ids))) as pool:
+            results = list(pool.map(ingest_folder, [data_dir] * len(movie_ids), movie_ids, chunksize=chunksize))
+    report = IngestReport(data_dir, results)
+    logger.info("Ingested %s: %s", data_dir, report.summary())
+    return report
@@ -0,0 +1,266 @@
+# backend/movies/packed.py
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from .reviews import RATING_COLUMN, header_columns, parse_rating, reviews_file
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, header length, JSON header, then 8-byte aligned
+# column sections described by the header
+_MAGIC = b"MVPACK01"
+_PREAMBLE = struct.Struct("<8sQ")
+_FORMAT_VERSION = 1
+
+# Text columns, stored back to back in one UTF-8 blob
+TEXT_FIELDS = ("date_of_review", "username", "review_title", "review_text")
+_TEXT_COLUMNS = ("Date of Review", "User", "Review Title", "Review")
+
+# Typed column sections: name -> array typecode
+_SECTIONS = {
+    "rating": "i",
+    "usefulness_vote": "I",
+    "total_votes": "I",
+    "text_offsets": "Q",
+}
+
+Stamp = Tuple[int, int]
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    """(mtime_ns, size) of a file, the same stamp MovieCatalog records"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def compile_dataset(data_dir: str, output_path: str) -> Dict[str, int]:
+    """Compile every movie folder under data_dir into one packed file.
+
+    Raises ValueError (naming the file and row) on a malformed CSV, so a
+    bad dump never produces a pack silently missing rows.
+    """
+    columns = {name: array(code) for name, code in _SECTIONS.items()}
+    offsets = columns["text_offsets"]
+    offsets.append(0)
+    blob = bytearray()
+    movies = []
+
+    for entry in sorted(os.scandir(data_dir), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        metadata_path = os.path.join(entry.path, "metadata.json")
+        metadata_stamp = file_stamp(metadata_path)
+        if metadata_stamp is None:
+            continue
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        metadata["id"] = entry.name
+
+        csv_path = reviews_file(data_dir, entry.name)
+        reviews_stamp = file_stamp(csv_path)
+        first = len(columns["rating"])
+        if reviews_stamp is not None:
+            with open(csv_path, "r", encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                cols = header_columns(header) if header else {}
+                for row in reader:
+                    if not row:
+                        continue
+                    try:
+                        columns["rating"].append(parse_rating(row[cols[RATING_COLUMN]]))
+                        columns["usefulness_vote"].append(int(row[cols["Usefulness Vote"]]))
+                        columns["total_votes"].append(int(row[cols["Total Votes"]]))
+                        for name in _TEXT_COLUMNS:
+                            col = cols.get(name)
+                            text = row[col] if col is not None and col < len(row) else ""
+                            blob += text.encode("utf-8")
+                            offsets.append(len(blob))
+                    except (KeyError, IndexError, ValueError, OverflowError) as e:
+                        raise ValueError(f"{csv_path}, line {reader.line_num}: {e!r}") from e
+
+        movies.append({
+            "id": entry.name,
+            "metadata": metadata,
+            "metadata_stamp": metadata_stamp,
+            "reviews_stamp": reviews_stamp,
+            "first": first,
+            "count": len(columns["rating"]) - first,
+        })
+
+    sections = {}
+    payloads = []
+    position = 0
+    for name, values in columns.items():
+        data = values.tobytes()
+        sections[name] = [position, len(values)]
+        payloads.append(data + b"\0" * (-len(data) % 8))
+        position += len(payloads[-1])
+    sections["text"] = [position, len(blob)]
+    payloads.append(bytes(blob))
+
+    header = json.dumps({
+        "version": _FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "movies": movies,
+        "sections": sections,
+    }, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(len(header) + _PREAMBLE.size) % 8)
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, len(header)))
+        f.write(header)
+        for payload in payloads:
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+    return {"movies": len(movies), "reviews": len(columns["rating"]), "bytes": position + len(blob)}
+
+
+class _Pack:
+    """One opened pack file: the parsed header plus memoryviews into the mapping"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _PREAMBLE.unpack_from(self.mm)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a packed dataset")
+        header = json.loads(self.mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        if header.get("version") != _FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was written by an incompatible version")
+
+        base = _PREAMBLE.size + header_len
+        view = memoryview(self.mm)
+        self.columns = {}
+        for name, code in _SECTIONS.items():
+            start, length = header["sections"][name]
+            itemsize = array(code).itemsize
+            self.columns[name] = view[base + start:base + start + length * itemsize].cast(code)
+        start, length = header["sections"]["text"]
+        self.text = view[base + start:base + start + length]
+        self.movies = {m["id"]: m for m in header["movies"]}
+
+
+class PackedDataset:
+    """Read side of the compiled dataset written by compile_dataset.
+
+    Numeric columns are memoryviews cast straight onto the mapped file and
+    text fields are sliced out of the blob on demand, so nothing is parsed
+    up front. Each movie's entry is only used while its metadata.json or
+    review CSV still has the stamp recorded at compile time; callers fall
+    back to the source files otherwise.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pack: Optional[_Pack] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """(Re)open the pack file if it appeared or changed since the last call"""
+        stamp = file_stamp(self.path)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            pack = None
+            if stamp is not None:
+                try:
+                    pack = _Pack(self.path)
+                    logger.info("Using packed dataset %s (%d movies)", self.path, len(pack.movies))
+                except (OSError, ValueError, struct.error) as e:
+                    logger.warning("Ignoring packed dataset %s: %s", self.path, e)
+            # A replaced mapping stays alive until readers holding it finish
+            self._pack = pack
+            self._stamp = stamp
+
+    def metadata(self, movie_id: str, metadata_stamp: Stamp) -> Optional[Dict[str, Any]]:
+        """Compiled metadata for a movie, if metadata.json is unchanged since compiling"""
+        pack = self._pack
+        movie = pack.movies.get(movie_id) if pack else None
+        if movie is None or tuple(movie["metadata_stamp"]) != tuple(metadata_stamp):
+            return None
+        return dict(movie["metadata"])
+
+    def _entry(self, movie_id: str, reviews_stamp: Optional[Stamp]):
+        pack = self._pack
+        movie = pack.movies.get(movie_id) if pack else None
+        if movie is None or reviews_stamp is None or movie["reviews_stamp"] is None:
+            return None, None
+        if tuple(movie["reviews_stamp"]) != tuple(reviews_stamp):
+            return None, None
+        return pack, movie
+
+    def has_reviews(self, movie_id: str, reviews_stamp: Optional[Stamp]) -> bool:
+        return self._entry(movie_id, reviews_stamp)[0] is not None
+
+    def review_columns(self, movie_id: str, reviews_stamp: Optional[Stamp]) -> Optional[Dict[str, memoryview]]:
+        """Zero-copy slices of the numeric columns for one movie's reviews"""
+        pack, movie = self._entry(movie_id, reviews_stamp)
+        if pack is None:
+            return None
+        first, end = movie["first"], movie["first"] + movie["count"]
+        return {name: pack.columns[name][first:end] for name in ("rating", "usefulness_vote", "total_votes")}
+
+    def text_column(self, movie_id: str, reviews_stamp: Optional[Stamp], field: str) -> Optional[List[str]]:
+        """One text field (see TEXT_FIELDS) of every review of a movie, leaving the others undecoded"""
+        pack, movie = self._entry(movie_id, reviews_stamp)
+        if pack is None:
+            return None
+        offsets = pack.columns["text_offsets"]
+        width = len(TEXT_FIELDS)
+        first = movie["first"] * width + TEXT_FIELDS.index(field)
+        end = (movie["first"] + movie["count"]) * width
+        return [str(pack.text[offsets[i]:offsets[i + 1]], "utf-8") for i in range(first, end, width)]
+
+    @staticmethod
+    def _review(pack: _Pack, movie_id: str, index: int, row: int) -> Dict[str, Any]:
+        offsets = pack.columns["text_offsets"]
+        base = row * len(TEXT_FIELDS)
+        text = {
+            field: str(pack.text[offsets[base + i]:offsets[base + i + 1]], "utf-8")
+            for i, field in enumerate(TEXT_FIELDS)
+        }
+        return {
+            'id': f"{movie_id}_review_{index}",
+            'movie_id': movie_id,
+            'user_id': None,
+            'date_of_review': text["date_of_review"],
+            'username': text["username"],
+            'usefulness_vote': pack.columns["usefulness_vote"][row],
+            'total_votes': pack.columns["total_votes"][row],
+            'rating': pack.columns["rating"][row],
+            'review_title': text["review_title"],
+            'review_text': text["review_text"],
+            'helpful_votes': 0,
+            'is_dataset_review': True
+        }
+
+    def read_review(self, movie_id: str, reviews_stamp: Optional[Stamp], index: int) -> Optional[Dict[str, Any]]:
+        pack, movie = self._entry(movie_id, reviews_stamp)
+        if pack is None or not 0 <= index < movie["count"]:
+            return None
+        return self._review(pack, movie_id, index, movie["first"] + index)
+
+    def iter_reviews(
+        self, movie_id: str, reviews_stamp: Optional[Stamp], start: int = 0
+    ) -> Generator[Dict[str, Any], None, int]:
+        """Same contract as reviews.iter_dataset_reviews (returns the row count)"""
+        pack, movie = self._entry(movie_id, reviews_stamp)
+        for index in range(start, movie["count"]):
+            yield self._review(pack, movie_id, index, movie["first"] + index)
+        return movie["count"]
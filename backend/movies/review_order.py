@@ -0,0 +1,152 @@
+# backend/movies/review_order.py
+import csv
+import heapq
+import logging
+import os
+import threading
+from array import array
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.metrics import timed
+from .reviews import RATING_COLUMN, parse_rating, reviews_file
+
+logger = logging.getLogger(__name__)
+
+# Accepted values for ?sort= on a movie's reviews
+REVIEW_SORT_KEYS = ("helpful", "newest", "rating_desc", "rating_asc")
+
+_MONTHS = {
+    name: number for number, name in enumerate((
+        "January", "February", "March", "April", "May", "June", "July",
+        "August", "September", "October", "November", "December",
+    ), 1)
+}
+
+# sort -> value from (rating, usefulness votes, day); smaller values come
+# first, and reviews with an unparseable rating or date go last
+_SORT_VALUES: Dict[str, Callable[[int, int, int], int]] = {
+    "helpful": lambda rating, votes, day: -votes,
+    "newest": lambda rating, votes, day: -day,
+    "rating_desc": lambda rating, votes, day: -rating if 1 <= rating <= 10 else 0,
+    "rating_asc": lambda rating, votes, day: rating if 1 <= rating <= 10 else 11,
+}
+
+
+def review_day(text: str) -> int:
+    """Day number of a "13 March 2003" review date; 0 if it does not parse"""
+    parts = text.split()
+    try:
+        return date(int(parts[2]), _MONTHS[parts[1]], int(parts[0])).toordinal()
+    except (IndexError, KeyError, ValueError):
+        return 0
+
+
+class ReviewOrdering:
+    """A movie's dataset reviews as numeric columns plus their row numbers presorted by each sort key.
+
+    Python's sort is stable, so ties keep CSV order.
+    """
+
+    __slots__ = ("ratings", "votes", "days", "rows")
+
+    def __init__(self, ratings: Sequence[int], votes: Sequence[int], days: Sequence[int]):
+        self.ratings = array("i", ratings)
+        self.votes = array("I", votes)
+        self.days = array("i", days)
+        self.rows: Dict[str, array] = {}
+        for sort, value in _SORT_VALUES.items():
+            keys = list(map(value, self.ratings, self.votes, self.days))
+            self.rows[sort] = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def entries(self, sort: str) -> Iterator[Tuple[int, int, None]]:
+        """(sort value, row, None) for every row, in order"""
+        value = _SORT_VALUES[sort]
+        ratings, votes, days = self.ratings, self.votes, self.days
+        for row in self.rows[sort]:
+            yield value(ratings[row], votes[row], days[row]), row, None
+
+
+def merge_user_reviews(
+    ordering: Optional[ReviewOrdering], sort: str, user_reviews: List[Dict[str, Any]]
+) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]]]]:
+    """Dataset rows and user reviews in `sort` order, as (value, row, review).
+
+    Dataset entries carry review=None (the caller fetches the row), so a page
+    only touches the rows it returns. User reviews count their helpful votes
+    the way dataset reviews count usefulness votes; ties put dataset reviews
+    first and keep submission order among user reviews.
+    """
+    value = _SORT_VALUES[sort]
+    users = sorted(
+        (
+            (value(review["rating"], review["usefulness_vote"] + review.get("helpful_votes", 0),
+                   review_day(review["date_of_review"])), -1, review)
+            for review in user_reviews
+        ),
+        key=lambda entry: entry[0],
+    )
+    if ordering is None:
+        return iter(users)
+    return heapq.merge(ordering.entries(sort), users, key=lambda entry: entry[0])
+
+
+@timed("review_order")
+def compute_review_ordering(path: str) -> ReviewOrdering:
+    """One pass over a review CSV, reading only the rating, vote and date columns"""
+    ratings, votes, days = [], [], []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is not None:
+            rating_col = header.index(RATING_COLUMN)
+            votes_col = header.index("Usefulness Vote")
+            date_col = header.index("Date of Review")
+            for row in reader:
+                if row:
+                    ratings.append(parse_rating(row[rating_col]))
+                    votes.append(int(row[votes_col]))
+                    days.append(review_day(row[date_col]))
+    return ReviewOrdering(ratings, votes, days)
+
+
+class ReviewOrderings:
+    """Presorted orderings of each movie's review CSV, built once per CSV version"""
+
+    def __init__(self, data_dir: str, packed=None):
+        self.data_dir = data_dir
+        self.packed = packed
+        self._cache: Dict[str, Tuple[Tuple[int, int], ReviewOrdering]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, movie_id: str) -> Optional[ReviewOrdering]:
+        """The movie's ordering, or None if it has no review CSV"""
+        path = reviews_file(self.data_dir, movie_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_size, stat.st_mtime_ns)
+
+        cached = self._cache.get(movie_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        packed_stamp = (stat.st_mtime_ns, stat.st_size)
+        columns = self.packed.review_columns(movie_id, packed_stamp) if self.packed else None
+        try:
+            if columns is not None:
+                with timed("review_order"):
+                    dates = self.packed.text_column(movie_id, packed_stamp, "date_of_review")
+                    ordering = ReviewOrdering(columns["rating"], columns["usefulness_vote"], map(review_day, dates))
+            else:
+                ordering = compute_review_ordering(path)
+        except Exception as e:
+            logger.warning("Error ordering reviews for %s: %s", movie_id, e)
+            ordering = ReviewOrdering((), (), ())
+        with self._lock:
+            self._cache[movie_id] = (stamp, ordering)
+        return ordering
@@ -0,0 +1,169 @@
+# backend/movies/review_search.py
+import base64
+import heapq
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_FORMAT_VERSION = 1
+
+
+def review_document(review: Dict[str, Any]) -> str:
+    """The text of a review that gets indexed"""
+    return f"{review.get('review_title', '')} {review.get('review_text', '')}"
+
+
+class ReviewSearchIndex:
+    """BM25 inverted index over dataset and user review text.
+
+    Postings are compact uint32 arrays of interleaved (doc, term frequency)
+    pairs. The dataset part is persisted as zlib-compressed JSON and keyed
+    to each CSV's size and mtime; user reviews are added one at a time, both
+    when the index is loaded and as they are submitted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._reset({})
+
+    def _reset(self, sources: Dict[str, List[int]]) -> None:
+        self.sources = sources
+        self.doc_movie: List[str] = []
+        self.doc_review: List[str] = []
+        self.doc_len = array("I")
+        self.total_len = 0
+        self.postings: Dict[str, array] = {}
+        self._review_ids = set()
+
+    def __len__(self) -> int:
+        return len(self.doc_review)
+
+    def add(self, review: Dict[str, Any]) -> bool:
+        """Index one review; returns False if it was already indexed"""
+        with self._lock:
+            if review["id"] in self._review_ids:
+                return False
+            terms = Counter(tokenize(review_document(review)))
+            doc = len(self.doc_review)
+            self.doc_movie.append(sys.intern(review["movie_id"]))
+            self.doc_review.append(review["id"])
+            self._review_ids.add(review["id"])
+            length = sum(terms.values())
+            self.doc_len.append(length)
+            self.total_len += length
+            for term, tf in terms.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = array("I")
+                postings.append(doc)
+                postings.append(tf)
+            return True
+
+    def build(self, sources: Dict[str, List[int]], reviews: Iterable[Dict[str, Any]]) -> None:
+        """Index every dataset review from scratch and persist the result"""
+        with self._lock:
+            self._reset(sources)
+            for review in reviews:
+                self.add(review)
+            self.save()
+
+    def load(
+        self,
+        sources: Dict[str, List[int]],
+        dataset_reviews: Callable[[], Iterable[Dict[str, Any]]],
+        user_reviews: Iterable[Dict[str, Any]],
+        rebuild: bool = False,
+    ) -> None:
+        """Read the persisted index, rebuilding it if any CSV changed, then add user reviews"""
+        with self._lock:
+            if rebuild or not self._read(sources):
+                logger.info("Building review search index at %s", self.path)
+                self.build(sources, dataset_reviews())
+            for review in user_reviews:
+                self.add(review)
+            self.loaded = True
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {
+                "version": _FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "sources": self.sources,
+                "doc_movie": self.doc_movie,
+                "doc_review": self.doc_review,
+                "doc_len": base64.b64encode(self.doc_len.tobytes()).decode("ascii"),
+                "postings": {
+                    term: base64.b64encode(postings.tobytes()).decode("ascii")
+                    for term, postings in self.postings.items()
+                },
+            }
+            # Per process: every worker loads the index at startup and may save it at once
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8")))
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("Could not save review search index %s: %s", self.path, e)
+
+    def _read(self, sources: Dict[str, List[int]]) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                payload = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return False
+        if (payload.get("version") != _FORMAT_VERSION
+                or payload.get("byteorder") != sys.byteorder
+                or payload.get("sources") != sources):
+            return False
+
+        self._reset(sources)
+        self.doc_movie = [sys.intern(m) for m in payload["doc_movie"]]
+        self.doc_review = payload["doc_review"]
+        self._review_ids = set(self.doc_review)
+        self.doc_len.frombytes(base64.b64decode(payload["doc_len"]))
+        self.total_len = sum(self.doc_len)
+        for term, encoded in payload["postings"].items():
+            postings = array("I")
+            postings.frombytes(base64.b64decode(encoded))
+            self.postings[term] = postings
+        return True
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[float, str, str]]:
+        """Top `limit` (score, movie_id, review_id) hits for a free-text query"""
+        with self._lock:
+            n_docs = len(self.doc_review)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings) // 2
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                pairs = iter(postings)
+                for doc, tf in zip(pairs, pairs):
+                    norm = K1 * (1 - B + B * self.doc_len[doc] / avg_len)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(score, self.doc_movie[doc], self.doc_review[doc]) for doc, score in top]
@@ -0,0 +1,276 @@
+# backend/movies/reviews.py
+import csv
+import io
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Any, Dict, Generator, List, Optional
+
+from backend.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+REVIEWS_FILENAME = "movieReviews.csv"
+
+# Sidecar next to each CSV: header (magic, csv size, csv mtime_ns, row count)
+# followed by row count + 1 little-endian uint64 byte offsets
+INDEX_SUFFIX = ".idx"
+_INDEX_MAGIC = b"RVIDX001"
+_INDEX_HEADER = struct.Struct("<8sQqQ")
+
+RATING_COLUMN = "User's Rating out of 10"
+
+
+def reviews_file(data_dir: str, movie_id: str) -> str:
+    """Path of the dataset review CSV for a movie"""
+    return os.path.join(data_dir, movie_id, REVIEWS_FILENAME)
+
+
+def parse_rating(rating_str: str) -> int:
+    """Clean the rating field (some rows hold scraped page text instead of a number)"""
+    rating_str = rating_str.strip()
+    try:
+        return int(rating_str) if rating_str and rating_str != '"' else 0
+    except ValueError:
+        return 0
+
+
+def header_columns(header: List[str]) -> Dict[str, int]:
+    columns = {name: i for i, name in enumerate(header)}
+    # Older dumps called the body column "Review Text"
+    if "Review" not in columns and "Review Text" in columns:
+        columns["Review"] = columns["Review Text"]
+    return columns
+
+
+def row_to_review(movie_id: str, index: int, row: List[str], columns: Dict[str, int]) -> Dict[str, Any]:
+    """Build the API dict for the index-th data row of a movie's CSV"""
+    text_col = columns.get("Review")
+    return {
+        'id': f"{movie_id}_review_{index}",
+        'movie_id': movie_id,
+        'user_id': None,
+        'date_of_review': row[columns['Date of Review']],
+        'username': row[columns['User']],
+        'usefulness_vote': int(row[columns['Usefulness Vote']]),
+        'total_votes': int(row[columns['Total Votes']]),
+        'rating': parse_rating(row[columns[RATING_COLUMN]]),
+        'review_title': row[columns['Review Title']],
+        'review_text': row[text_col] if text_col is not None and text_col < len(row) else '',
+        'helpful_votes': 0,
+        'is_dataset_review': True
+    }
+
+
+class ReviewIndex:
+    """Byte offset of every data row in a review CSV.
+
+    offsets[i] is where row i starts and offsets[-1] is where the last row
+    ends, so row i is the slice offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, size: int, mtime_ns: int, offsets: array):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return max(len(self.offsets) - 1, 0)
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+
+class RowOffsetScanner:
+    """Finds where each CSV record starts, honouring quoted multi-line fields.
+
+    Feed it every physical line of the file in order, then call finish().
+    A physical line with an odd number of quote characters toggles whether
+    we are inside a quoted field (escaped quotes come in pairs). The header
+    record is skipped; blank records are ignored, as csv.DictReader does.
+    """
+
+    def __init__(self):
+        self.offsets = array("Q")
+        self.position = 0
+        self.in_quotes = False
+        self.seen_header = False
+
+    def feed(self, line: bytes) -> None:
+        if not self.in_quotes and line.strip(b"\r\n"):
+            if self.seen_header:
+                self.offsets.append(self.position)
+            self.seen_header = True
+        if line.count(b'"') % 2:
+            self.in_quotes = not self.in_quotes
+        self.position += len(line)
+
+    def finish(self) -> array:
+        # A trailing newline belongs to the last record, so the end is the file size
+        self.offsets.append(self.position)
+        return self.offsets
+
+
+@timed("csv_index")
+def scan_row_offsets(path: str) -> array:
+    """Byte offset of every data record plus the file size (see RowOffsetScanner)"""
+    scanner = RowOffsetScanner()
+    with open(path, "rb") as f:
+        for line in f:
+            scanner.feed(line)
+    return scanner.finish()
+
+
+def _read_index_file(index_path: str, stat: os.stat_result) -> Optional[ReviewIndex]:
+    try:
+        with open(index_path, "rb") as f:
+            magic, size, mtime_ns, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            if magic != _INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return None
+            offsets = array("Q")
+            offsets.frombytes(f.read((count + 1) * offsets.itemsize))
+    except (OSError, struct.error, ValueError):
+        return None
+    if len(offsets) != count + 1:
+        return None
+    return ReviewIndex(size, mtime_ns, offsets)
+
+
+def _write_index_file(index_path: str, index: ReviewIndex) -> None:
+    tmp_path = f"{index_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, index.size, index.mtime_ns, len(index)))
+            f.write(index.offsets.tobytes())
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        # Read-only data dirs still get the in-memory index
+        logger.debug("Could not write review index %s: %s", index_path, e)
+
+
+_indexes: Dict[str, ReviewIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_review_index(path: str, rebuild: bool = False) -> ReviewIndex:
+    """Offset index for a review CSV, from memory, the sidecar file or a fresh scan"""
+    stat = os.stat(path)
+    index = _indexes.get(path)
+    if index is not None and not rebuild and index.matches(stat):
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and not rebuild and index.matches(stat):
+            return index
+
+        index_path = path + INDEX_SUFFIX
+        index = None if rebuild else _read_index_file(index_path, stat)
+        if index is None:
+            index = ReviewIndex(stat.st_size, stat.st_mtime_ns, scan_row_offsets(path))
+            _write_index_file(index_path, index)
+        _indexes[path] = index
+        return index
+
+
+def put_review_index(path: str, index: ReviewIndex) -> None:
+    """Adopt an index built elsewhere (e.g. by an ingest worker) and persist its sidecar"""
+    with _indexes_lock:
+        _write_index_file(path + INDEX_SUFFIX, index)
+        _indexes[path] = index
+
+
+def _parse_record(data: bytes) -> List[str]:
+    return next(csv.reader(io.StringIO(data.decode("utf-8"), newline="")), [])
+
+
+class DatasetRowReader:
+    """Random access to the rows of one movie's review CSV, keeping the file mapped between reads"""
+
+    def __init__(self, data_dir: str, movie_id: str):
+        self.movie_id = movie_id
+        self.path = reviews_file(data_dir, movie_id)
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._offsets = None
+        self._columns: Optional[Dict[str, int]] = None
+
+    def _open(self) -> bool:
+        if self._mm is None:
+            if not os.path.exists(self.path):
+                return False
+            self._offsets = get_review_index(self.path).offsets
+            if len(self._offsets) < 2:  # no data rows
+                return False
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._columns = header_columns(_parse_record(self._mm[:self._offsets[0]]))
+        return True
+
+    def read(self, row: int) -> Optional[Dict[str, Any]]:
+        if row < 0 or not self._open() or row >= len(self._offsets) - 1:
+            return None
+        record = _parse_record(self._mm[self._offsets[row]:self._offsets[row + 1]])
+        return row_to_review(self.movie_id, row, record, self._columns)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def __enter__(self) -> "DatasetRowReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_dataset_review(data_dir: str, movie_id: str, row: int) -> Optional[Dict[str, Any]]:
+    """Fetch a single dataset review by row number, seeking straight to it"""
+    with DatasetRowReader(data_dir, movie_id) as reader:
+        return reader.read(row)
+
+
+def iter_dataset_reviews(data_dir: str, movie_id: str, start: int = 0) -> Generator[Dict[str, Any], None, int]:
+    """Lazily yield dataset reviews from row `start` onwards.
+
+    For start > 0 the offset index is used to seek directly to the row. The
+    generator's return value is the total number of data rows, so callers
+    using ``yield from`` can continue numbering past the end of the CSV.
+    """
+    path = reviews_file(data_dir, movie_id)
+    count = 0
+    if not os.path.exists(path):
+        return count
+
+    try:
+        with open(path, 'rb') as raw:
+            columns = None
+            if start > 0:
+                index = get_review_index(path)
+                if start >= len(index):
+                    return len(index)
+                columns = header_columns(_parse_record(raw.read(index.offsets[0])))
+                raw.seek(index.offsets[start])
+                count = start
+
+            reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            if columns is None:
+                header = next(reader, None)
+                if header is None:
+                    return count
+                columns = header_columns(header)
+            for row in reader:
+                if not row:
+                    continue
+                review = row_to_review(movie_id, count, row, columns)
+                count += 1
+                yield review
+    except Exception as e:
+        logger.warning("Error loading reviews for %s: %s", movie_id, e)
+
+    return count
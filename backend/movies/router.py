@@ -1,218 +1,379 @@
 # backend/movies/router.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterator, List, Optional
 from datetime import datetime
+from itertools import islice
 
 from backend.authentication import security
 from backend.authentication.schemas import UserResponse, UserBase
+from backend.storage import run_io
 from . import schemas
 from . import utils
+from .http_cache import cache_headers, etag_matches
+from .search import SORT_KEYS
+from .serialization import FastJSONResponse, ndjson_lines, projector
 
 router = APIRouter(prefix="/movies", tags=["movies"])
+reviews_router = APIRouter(prefix="/reviews", tags=["reviews"])
+
+# Upper bounds for ?limit= on paged listings
+MAX_REVIEW_PAGE_SIZE = 500
+MAX_WATCHLIST_PAGE_SIZE = 500
+# Reviews read per I/O executor hop when streaming a full ndjson listing
+NDJSON_BATCH_SIZE = 256
+# Seconds clients are told to wait while the review search index loads
+REVIEW_SEARCH_RETRY_AFTER = 5
+
+_review_fields = projector(schemas.ReviewResponse)
+
+# Mutating handlers run their check-then-commit transaction on the I/O
+# executor (it takes the store lock and, with SQLite, the database write
+# lock) and only await the group-commit flush on the event loop
+
+def _commit_review(movie_id: str, review: schemas.ReviewCreate, current_user: UserResponse):
+    # Hold the lock from the duplicate check until the review is logged
+    with utils.user_data_transaction(wait=False) as tickets:
+        # Check if user already reviewed this movie
+        if utils.user_data_store.user_review_for_movie(movie_id, current_user.id):
+            raise HTTPException(status_code=400, detail="You already reviewed this movie")
+    
+        new_review = {
+            "id": utils.user_data_store.next_review_id(),
+            "movie_id": movie_id,
+            "user_id": current_user.id,
+            "username": current_user.username,
+            "date_of_review": datetime.now().strftime("%d %B %Y"),
+            "usefulness_vote": 0,
+            "total_votes": 0,
+            "rating": review.rating,
+            "review_title": review.review_title,
+            "review_text": review.review_text,
+            "helpful_votes": 0,
+            "is_dataset_review": False,
+            "created_at": datetime.now().isoformat()
+        }
+    
+        utils.commit_user_data("review", review=new_review)
+    return tickets, new_review
 
 # TRANSACTION 1: Submit Review
 @router.post("/{movie_id}/reviews", response_model=schemas.ReviewResponse)
-def submit_review(
+async def submit_review(
     movie_id: str,
     review: schemas.ReviewCreate,
     current_user: UserResponse = Depends(security.get_current_user)
 ):
     """Submit a review for a movie - TRANSACTION 1"""
-    movies = utils.load_all_movies()
-    movie = next((m for m in movies if m["id"] == movie_id), None)
+    movie = utils.get_movie(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    # Check if user already reviewed this movie
-    user_data = utils.load_user_data()
-    existing_review = next(
-        (r for r in user_data["user_reviews"] 
-         if r["movie_id"] == movie_id and r["user_id"] == current_user.id), None
-    )
-    if existing_review:
-        raise HTTPException(status_code=400, detail="You already reviewed this movie")
+    tickets, new_review = await run_io(_commit_review, movie_id, review, current_user)
+    await utils.flush_user_data(tickets)
+    # Indexing waits for the index lock, which a rebuild can hold for seconds
+    await run_io(utils.index_user_review, new_review)
     
-    new_review = {
-        "id": f"user_review_{len(user_data['user_reviews']) + 1}",
-        "movie_id": movie_id,
-        "user_id": current_user.id,
-        "username": current_user.username,
-        "date_of_review": datetime.now().strftime("%d %B %Y"),
-        "usefulness_vote": 0,
-        "total_votes": 0,
-        "rating": review.rating,
-        "review_title": review.review_title,
-        "review_text": review.review_text,
-        "helpful_votes": 0,
-        "is_dataset_review": False,
-        "created_at": datetime.now().isoformat()
-    }
+    return new_review
+
+def _commit_vote(review_id: str, helpful: bool, user_id: int) -> List[int]:
+    # Hold the lock from the duplicate check until the vote is logged
+    with utils.user_data_transaction(wait=False) as tickets:
+        # Check if user already voted
+        if utils.user_data_store.has_voted(review_id, user_id):
+            raise HTTPException(status_code=400, detail="You already voted on this review")
     
-    user_data["user_reviews"].append(new_review)
-    utils.save_user_data(user_data)
+        # Find the review (could be in dataset reviews or user reviews)
+        # For now, we'll only track votes on user-generated reviews
+        if not utils.user_data_store.get_review(review_id):
+            raise HTTPException(status_code=404, detail="Review not found or cannot be voted on")
     
-    return new_review
+        utils.commit_user_data("vote", review_id=review_id, user_id=user_id, helpful=helpful)
+    return tickets
 
 # TRANSACTION 2: Rate Review (Helpful/Not Helpful)
 @router.post("/reviews/{review_id}/vote")
-def vote_on_review(
+async def vote_on_review(
     review_id: str,
     helpful: bool = True,
     current_user: UserResponse = Depends(security.get_current_user)
 ):
     """Vote on a review as helpful - TRANSACTION 2"""
-    user_data = utils.load_user_data()
-    
-    # Check if user already voted
-    vote_key = f"{current_user.id}_{review_id}"
-    if vote_key in user_data["review_votes"]:
-        raise HTTPException(status_code=400, detail="You already voted on this review")
-    
-    # Find and update the review (could be in dataset reviews or user reviews)
-    updated = False
-    
-    # Check user reviews first
-    for review in user_data["user_reviews"]:
-        if review["id"] == review_id:
-            if helpful:
-                review["helpful_votes"] = review.get("helpful_votes", 0) + 1
-            updated = True
-            break
-    
-    # If not found in user reviews, we'd need to handle dataset reviews differently
-    # For now, we'll only track votes on user-generated reviews
-    
-    if not updated:
-        raise HTTPException(status_code=404, detail="Review not found or cannot be voted on")
-    
-    user_data["review_votes"][vote_key] = helpful
-    utils.save_user_data(user_data)
+    tickets = await run_io(_commit_vote, review_id, helpful, current_user.id)
+    await utils.flush_user_data(tickets)
     
     return {"message": "Vote recorded", "helpful": helpful}
 
+def _commit_watchlist_add(movie: dict, user_id: int) -> List[int]:
+    # Hold the lock from the duplicate check until the item is logged
+    with utils.user_data_transaction(wait=False) as tickets:
+        if utils.user_data_store.in_watchlist(user_id, movie["id"]):
+            raise HTTPException(status_code=400, detail="Movie already in watchlist")
+    
+        utils.commit_user_data("watchlist_add", user_id=user_id, item={
+            "movie_id": movie["id"],
+            "added_at": datetime.now().isoformat(),
+            "movie_title": movie["title"]
+        })
+    return tickets
+
 # TRANSACTION 3: Add to Watchlist
 @router.post("/{movie_id}/watchlist")
-def add_to_watchlist(
+async def add_to_watchlist(
     movie_id: str,
     current_user: UserResponse = Depends(security.get_current_user)
 ):
     """Add movie to user's watchlist - TRANSACTION 3"""
-    movies = utils.load_all_movies()
-    movie = next((m for m in movies if m["id"] == movie_id), None)
+    movie = utils.get_movie(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    user_data = utils.load_user_data()
-    if str(current_user.id) not in user_data["watchlists"]:
-        user_data["watchlists"][str(current_user.id)] = []
-    
-    watchlist = user_data["watchlists"][str(current_user.id)]
-    if any(item["movie_id"] == movie_id for item in watchlist):
-        raise HTTPException(status_code=400, detail="Movie already in watchlist")
+    tickets = await run_io(_commit_watchlist_add, movie, current_user.id)
+    await utils.flush_user_data(tickets)
+    return {"message": "Added to watchlist"}
+
+def _commit_report(review_id: str, report: schemas.ReportCreate, current_user: UserResponse) -> List[int]:
+    # Hold the lock from the duplicate check until the report is logged
+    with utils.user_data_transaction(wait=False) as tickets:
+        # Check if user already reported this review
+        if utils.user_data_store.has_reported(review_id, current_user.id):
+            raise HTTPException(status_code=400, detail="You already reported this review")
     
-    watchlist.append({
-        "movie_id": movie_id,
-        "added_at": datetime.now().isoformat(),
-        "movie_title": movie["title"]
-    })
+        new_report = {
+            "review_id": review_id,
+            "user_id": current_user.id,
+            "username": current_user.username,
+            "reason": report.reason,
+            "reported_at": datetime.now().isoformat(),
+            "status": "pending"
+        }
     
-    utils.save_user_data(user_data)
-    return {"message": "Added to watchlist"}
+        utils.commit_user_data("report", report=new_report)
+    return tickets
 
 # TRANSACTION 4: Report Review
 @router.post("/reviews/{review_id}/report")
-def report_review(
+async def report_review(
     review_id: str,
     report: schemas.ReportCreate,
     current_user: UserResponse = Depends(security.get_current_user)
 ):
     """Report a review for inappropriate content - TRANSACTION 4"""
-    user_data = utils.load_user_data()
-    
-    # Check if user already reported this review
-    existing_report = next(
-        (r for r in user_data["reports"] 
-         if r["review_id"] == review_id and r["user_id"] == current_user.id), None
-    )
-    if existing_report:
-        raise HTTPException(status_code=400, detail="You already reported this review")
-    
-    new_report = {
-        "review_id": review_id,
-        "user_id": current_user.id,
-        "username": current_user.username,
-        "reason": report.reason,
-        "reported_at": datetime.now().isoformat(),
-        "status": "pending"
-    }
-    
-    user_data["reports"].append(new_report)
-    utils.save_user_data(user_data)
+    tickets = await run_io(_commit_report, review_id, report, current_user)
+    await utils.flush_user_data(tickets)
     
     return {"message": "Review reported successfully"}
 
 # Movie browsing endpoints
 @router.get("/", response_model=List[schemas.MovieResponse])
-def get_movies(
+async def get_movies(
+    response: Response,
     search: Optional[str] = Query(None),
     genre: Optional[str] = Query(None),
     min_rating: Optional[float] = Query(None),
-    year: Optional[int] = Query(None)
+    year: Optional[int] = Query(None),
+    sort: Optional[str] = Query(None, pattern=f"^({'|'.join(SORT_KEYS)})$"),
+    limit: Optional[int] = Query(None, ge=1),
+    include_stats: bool = Query(False),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Get movies with search and filter"""
-    return utils.search_movies(search, genre, min_rating, year)
+    if include_stats:
+        etag = await utils.read_user_data_async(utils.movies_etag, True)
+    else:
+        etag = utils.movies_etag()
+    headers = cache_headers(etag)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    movies = utils.search_movies(search, genre, min_rating, year, sort, limit)
+    if include_stats:
+        stats = await utils.get_many_movie_stats_async([m["id"] for m in movies])
+        movies = [{**m, "stats": s} for m, s in zip(movies, stats)]
+    return movies
+
+@router.post("/batch", response_model=schemas.MovieBatchResponse)
+async def get_movies_batch(request: schemas.MovieBatchRequest):
+    """Get metadata for many movies in one request"""
+    movies, missing = [], []
+    for movie_id in dict.fromkeys(request.ids):
+        movie = utils.get_movie(movie_id)
+        if movie:
+            movies.append(movie)
+        else:
+            missing.append(movie_id)
+    return {"movies": movies, "missing": missing}
 
 @router.get("/{movie_id}", response_model=schemas.MovieResponse)
-def get_movie(movie_id: str):
+async def get_movie(movie_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     """Get specific movie details"""
-    movies = utils.load_all_movies()
-    movie = next((m for m in movies if m["id"] == movie_id), None)
+    etag = utils.movie_etag(movie_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    headers = cache_headers(etag)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    movie = utils.get_movie(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
+@router.get("/{movie_id}/stats", response_model=schemas.MovieStats)
+async def get_movie_stats(movie_id: str):
+    """Get review statistics for a movie"""
+    if not utils.get_movie(movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return await utils.get_movie_stats_async(movie_id)
+
 @router.get("/{movie_id}/reviews", response_model=List[schemas.ReviewResponse])
-def get_movie_reviews(movie_id: str):
-    """Get reviews for a movie (both dataset and user reviews)"""
-    dataset_reviews = utils.load_movie_reviews(movie_id)
-    user_data = utils.load_user_data()
-    user_reviews = [r for r in user_data["user_reviews"] if r["movie_id"] == movie_id]
-    
-    return dataset_reviews + user_reviews
+async def get_movie_reviews(
+    movie_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_REVIEW_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    sort: Optional[str] = Query(None, pattern=f"^({'|'.join(utils.REVIEW_SORT_KEYS)})$"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get reviews for a movie (both dataset and user reviews).
+
+    Without `sort` dataset reviews come in CSV order, then user reviews.
+    With `limit`, only that window is read and `X-Next-Offset` points at the
+    next page. `format=ndjson` streams one review per line.
+    """
+    etag = await utils.read_user_data_async(utils.reviews_etag, movie_id)
+    headers = cache_headers(etag) if etag else {}
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Rows are built by reviews.row_to_review or validated on submit, so
+    # they are only trimmed to the response fields, not re-validated
+    if sort is None:
+        reviews = utils.iter_movie_reviews(movie_id, offset)
+    else:
+        reviews = utils.iter_sorted_reviews(movie_id, sort, offset)
+    rows = map(_review_fields, reviews)
+    if limit is None:
+        if format == "ndjson":
+            return StreamingResponse(_stream_ndjson(rows), media_type="application/x-ndjson", headers=headers)
+        return FastJSONResponse(await run_io(list, rows), headers=headers)
+
+    page = await run_io(list, islice(rows, limit + 1))
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    if format == "ndjson":
+        return Response(b"".join(ndjson_lines(page)), media_type="application/x-ndjson", headers=headers)
+    return FastJSONResponse(page, headers=headers)
+
+async def _stream_ndjson(rows: Iterator[dict]) -> AsyncIterator[bytes]:
+    # Rows are read from disk in batches on the I/O executor
+    while True:
+        batch = await run_io(list, islice(rows, NDJSON_BATCH_SIZE))
+        if not batch:
+            return
+        yield b"".join(ndjson_lines(batch))
+
+@router.get("/{movie_id}/reviews/{review_id}", response_model=schemas.ReviewResponse)
+async def get_movie_review(movie_id: str, review_id: str):
+    """Get a single review of a movie"""
+    review = await run_io(utils.get_review, movie_id, review_id)
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return review
+
+@router.post("/admin/reload", dependencies=[Depends(security.require_admin)])
+async def reload_catalog():
+    """Re-read every movie folder into the catalog (admin only)"""
+    await run_io(utils.catalog.reload)
+    return {"message": "Catalog reloaded", "movies": len(utils.catalog)}
 
-@router.get("/user/watchlist")
-def get_watchlist(current_user: UserResponse = Depends(security.get_current_user)):
-    """Get user's watchlist"""
-    user_data = utils.load_user_data()
-    watchlist = user_data["watchlists"].get(str(current_user.id), [])
+@router.get("/user/watchlist", response_model=List[schemas.WatchlistItem])
+async def get_watchlist(
+    response: Response,
+    sort: str = Query("added_at", pattern=f"^({'|'.join(utils.WATCHLIST_SORT_KEYS)})$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_WATCHLIST_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: UserResponse = Depends(security.get_current_user)
+):
+    """Get user's watchlist.
+
+    With `limit`, only that page is returned and `X-Next-Offset` points at
+    the next one.
+    """
+    items, has_more = await run_io(utils.get_watchlist, current_user.id, sort, offset, limit)
+    if has_more:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return items
+
+def _commit_watchlist_batch(request: schemas.WatchlistBatchRequest, user_id: int):
+    result = {"added": [], "removed": [], "already_in_watchlist": [], "not_in_watchlist": [], "not_found": []}
+    store = utils.user_data_store
     
-    # Enrich with movie data
-    movies = utils.load_all_movies()
-    enriched_watchlist = []
-    for item in watchlist:
-        movie = next((m for m in movies if m["id"] == item["movie_id"]), None)
-        if movie:
-            enriched_watchlist.append({
-                **item,
-                "movie_title": movie["title"],
-                "movie_year": movie["datePublished"][:4],
-                "movie_rating": movie["movieIMDbRating"]
-            })
+    with utils.user_data_transaction(wait=False) as tickets:
+        to_remove = []
+        for movie_id in dict.fromkeys(request.remove):
+            if store.in_watchlist(user_id, movie_id):
+                to_remove.append(movie_id)
+            else:
+                result["not_in_watchlist"].append(movie_id)
+        
+        to_add = []
+        now = datetime.now().isoformat()
+        for movie_id in dict.fromkeys(request.add):
+            movie = utils.get_movie(movie_id)
+            if not movie:
+                result["not_found"].append(movie_id)
+            elif store.in_watchlist(user_id, movie_id) and movie_id not in to_remove:
+                result["already_in_watchlist"].append(movie_id)
+            else:
+                to_add.append({"movie_id": movie_id, "added_at": now, "movie_title": movie["title"]})
+        
+        if to_add or to_remove:
+            utils.commit_user_data("watchlist_batch", user_id=user_id, add=to_add, remove=to_remove)
     
-    return enriched_watchlist
+    result["added"] = [item["movie_id"] for item in to_add]
+    result["removed"] = to_remove
+    return tickets, result
+
+@router.post("/user/watchlist/batch", response_model=schemas.WatchlistBatchResponse)
+async def update_watchlist_batch(
+    request: schemas.WatchlistBatchRequest,
+    current_user: UserResponse = Depends(security.get_current_user)
+):
+    """Add and remove many watchlist items with a single write"""
+    tickets, result = await run_io(_commit_watchlist_batch, request, current_user.id)
+    await utils.flush_user_data(tickets)
+    return result
+
+def _commit_watchlist_remove(movie_id: str, user_id: int) -> List[int]:
+    with utils.user_data_transaction(wait=False) as tickets:
+        utils.commit_user_data("watchlist_remove", user_id=user_id, movie_id=movie_id)
+    return tickets
 
 @router.delete("/{movie_id}/watchlist")
-def remove_from_watchlist(
+async def remove_from_watchlist(
     movie_id: str,
     current_user: UserResponse = Depends(security.get_current_user)
 ):
     """Remove movie from watchlist"""
-    user_data = utils.load_user_data()
-    watchlist = user_data["watchlists"].get(str(current_user.id), [])
-    
-    user_data["watchlists"][str(current_user.id)] = [
-        item for item in watchlist if item["movie_id"] != movie_id
-    ]
-    
-    utils.save_user_data(user_data)
-    return {"message": "Removed from watchlist"}
\ No newline at end of file
+    tickets = await run_io(_commit_watchlist_remove, movie_id, current_user.id)
+    await utils.flush_user_data(tickets)
+    return {"message": "Removed from watchlist"}
+
+@reviews_router.get("/search", response_model=List[schemas.ReviewSearchHit])
+async def search_reviews(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Full-text search over review titles and text, ranked by BM25"""
+    if not utils.review_search_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Review search index is still loading",
+            headers={"Retry-After": str(REVIEW_SEARCH_RETRY_AFTER)},
+        )
+    # Rebuilds the dataset part if a review CSV changed since it was built
+    return await run_io(utils.search_reviews, q, limit)
\ No newline at end of file
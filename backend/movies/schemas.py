@@ -1,6 +1,6 @@
 # backend/movies/schemas.py - REMOVE UserResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class MovieMetadata(BaseModel):
     title: str
@@ -17,8 +17,22 @@ class MovieMetadata(BaseModel):
     description: str
     duration: int
 
+class MovieStats(BaseModel):
+    review_count: int
+    average_rating: float
+    rating_histogram: Dict[str, int]
+    usefulness_votes: int
+
 class MovieResponse(MovieMetadata):
     id: str
+    stats: Optional[MovieStats] = None
+
+class MovieBatchRequest(BaseModel):
+    ids: List[str] = Field(max_length=500)
+
+class MovieBatchResponse(BaseModel):
+    movies: List[MovieResponse]
+    missing: List[str]
 
 class ReviewBase(BaseModel):
     rating: int = Field(ge=1, le=10)
@@ -31,7 +45,7 @@ class ReviewCreate(ReviewBase):
 class ReviewResponse(BaseModel):
     id: str
     movie_id: str
-    user_id: int
+    user_id: Optional[int] = None  # None for dataset reviews
     username: str
     date_of_review: str
     usefulness_vote: int
@@ -42,6 +56,11 @@ class ReviewResponse(BaseModel):
     helpful_votes: int = 0
     is_dataset_review: bool = False
 
+class ReviewSearchHit(BaseModel):
+    movie_id: str
+    review_id: str
+    score: float
+
 class WatchlistItem(BaseModel):
     movie_id: str
     added_at: str
@@ -49,6 +68,17 @@ class WatchlistItem(BaseModel):
     movie_year: Optional[str] = None
     movie_rating: Optional[float] = None
 
+class WatchlistBatchRequest(BaseModel):
+    add: List[str] = Field(default_factory=list, max_length=500)
+    remove: List[str] = Field(default_factory=list, max_length=500)
+
+class WatchlistBatchResponse(BaseModel):
+    added: List[str]
+    removed: List[str]
+    already_in_watchlist: List[str]
+    not_in_watchlist: List[str]
+    not_found: List[str]
+
 class ReportCreate(BaseModel):
     review_id: str
     reason: str
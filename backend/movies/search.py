@@ -0,0 +1,147 @@
+# backend/movies/search.py
+import bisect
+import heapq
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Accepted values for ?sort= on movie listings
+SORT_KEYS = ("title", "rating_desc", "rating_asc", "year_desc", "year_asc")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a piece of text"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def movie_year(movie: Dict[str, Any]) -> int:
+    year = movie.get("datePublished", "")[:4]
+    return int(year) if year.isdigit() else 0
+
+
+class MovieSearchIndex:
+    """Prebuilt lookup structures over one catalog version.
+
+    - title token prefixes -> ids
+    - genre (lowercased) -> ids
+    - ratings sorted ascending, for range queries with bisect
+    - release year -> ids
+    - one presorted id list per sort key, for top-N without a full sort
+    """
+
+    def __init__(self, movies: Iterable[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self._movies: Dict[str, Dict[str, Any]] = {}
+        self._prefixes: Dict[str, Set[str]] = defaultdict(set)
+        self._genres: Dict[str, Set[str]] = defaultdict(set)
+        self._years: Dict[int, Set[str]] = defaultdict(set)
+
+        rated = []
+        for movie in movies:
+            movie_id = movie["id"]
+            self._movies[movie_id] = movie
+            for token in tokenize(movie["title"]):
+                for end in range(1, len(token) + 1):
+                    self._prefixes[token[:end]].add(movie_id)
+            for genre in movie["movieGenres"]:
+                self._genres[genre.lower()].add(movie_id)
+            self._years[movie_year(movie)].add(movie_id)
+            rated.append((movie["movieIMDbRating"], movie_id))
+
+        rated.sort()
+        self._ratings = [rating for rating, _ in rated]
+        self._rating_ids = [movie_id for _, movie_id in rated]
+
+        ids = list(self._movies)
+
+        def title(movie_id):
+            return self._movies[movie_id]["title"].lower()
+
+        def rating(movie_id):
+            return self._movies[movie_id]["movieIMDbRating"]
+
+        def year(movie_id):
+            return movie_year(self._movies[movie_id])
+
+        self._orders: Dict[Optional[str], List[str]] = {
+            None: ids,
+            "title": sorted(ids, key=title),
+            "rating_desc": sorted(ids, key=lambda i: (-rating(i), title(i))),
+            "rating_asc": sorted(ids, key=lambda i: (rating(i), title(i))),
+            "year_desc": sorted(ids, key=lambda i: (-year(i), title(i))),
+            "year_asc": sorted(ids, key=lambda i: (year(i), title(i))),
+        }
+        self._ranks = {key: {movie_id: pos for pos, movie_id in enumerate(order)}
+                       for key, order in self._orders.items()}
+
+    def rank_key(self, sort: str) -> Callable[[str], int]:
+        """Key function giving each movie id its position in a SORT_KEYS order"""
+        ranks = self._ranks[sort]
+        missing = len(ranks)
+
+        def rank(movie_id):
+            return ranks.get(movie_id, missing)
+        return rank
+
+    def _title_matches(self, query: str) -> Set[str]:
+        tokens = tokenize(query)
+        if not tokens:
+            # Nothing indexable (e.g. punctuation only): fall back to a substring scan
+            needle = query.lower()
+            return {i for i, m in self._movies.items() if needle in m["title"].lower()}
+        postings = sorted((self._prefixes.get(token, set()) for token in tokens), key=len)
+        return set.intersection(*postings)
+
+    def _genre_matches(self, genre: str) -> Set[str]:
+        genre = genre.lower()
+        if genre in self._genres:
+            return self._genres[genre]
+        # Partial genre names match every genre containing them
+        matches: Set[str] = set()
+        for name, ids in self._genres.items():
+            if genre in name:
+                matches |= ids
+        return matches
+
+    def _rating_floor(self, min_rating: float) -> List[str]:
+        """Ids rated min_rating or higher, via bisect on the sorted ratings"""
+        return self._rating_ids[bisect.bisect_left(self._ratings, min_rating):]
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        year: Optional[int] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Intersect the posting sets of every given filter, then order and cut to limit"""
+        postings = []
+        if query:
+            postings.append(self._title_matches(query))
+        if genre:
+            postings.append(self._genre_matches(genre))
+        if year is not None:
+            postings.append(self._years.get(year, set()))
+
+        order = self._orders[sort]
+        if not postings and min_rating is None:
+            ids = order[:limit] if limit is not None else order
+        else:
+            if postings:
+                postings.sort(key=len)
+                candidates = postings[0].intersection(*postings[1:])
+                if min_rating is not None:
+                    candidates = {i for i in candidates if self._movies[i]["movieIMDbRating"] >= min_rating}
+            else:
+                candidates = self._rating_floor(min_rating)
+            rank = self._ranks[sort].__getitem__
+            if limit is not None and limit < len(candidates):
+                ids = heapq.nsmallest(limit, candidates, key=rank)
+            else:
+                ids = sorted(candidates, key=rank)
+
+        return [self._movies[movie_id] for movie_id in ids]
@@ -0,0 +1,45 @@
+# backend/movies/serialization.py
+import json
+from typing import Any, Dict, Iterable, Iterator, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response for data that is already shaped like its response model"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def projector(model: Type[BaseModel]):
+    """Function trimming a trusted dict to the model's fields, filling in defaults.
+
+    Used instead of validating every row when the data was built or
+    validated upstream (dataset rows, stored user reviews).
+    """
+    defaults = {name: field.default for name, field in model.model_fields.items()}
+
+    def project(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: row.get(name, default) for name, default in defaults.items()}
+    return project
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield dumps(row) + b"\n"
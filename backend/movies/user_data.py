@@ -0,0 +1,425 @@
+# backend/movies/user_data.py
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.metrics import timed
+from backend.storage import AppendLog, atomic_write_json, run_io
+from .aggregates import ReviewAggregate
+
+logger = logging.getLogger(__name__)
+
+# Fold the log into a fresh snapshot after this many records
+SNAPSHOT_EVERY = int(os.environ.get("USER_DATA_SNAPSHOT_EVERY", "1000"))
+# Seconds between fsyncs of the transaction log (0 = fsync every group
+# commit); also the most acknowledged writes an OS crash can lose
+FSYNC_INTERVAL = float(os.environ.get("USER_DATA_FSYNC_INTERVAL", "1.0"))
+
+
+def new_user_stats() -> Dict[str, int]:
+    return {"review_count": 0, "rating_sum": 0, "helpful_votes": 0, "watchlist_count": 0}
+
+
+def empty_user_data() -> Dict[str, Any]:
+    return {
+        "user_reviews": [],
+        "watchlists": {},
+        "review_votes": {},
+        "reports": [],
+        "penalties": {}
+    }
+
+
+# Kinds of log record; each is applied by UserDataStore._apply_<op>
+OPERATIONS = ("review", "vote", "watchlist_add", "watchlist_remove", "watchlist_batch", "report")
+
+
+class UserDataStore:
+    """User-generated data kept in memory and persisted as snapshot + transaction log.
+
+    The snapshot is user_data.json (plus a "_seq" marker); every mutation
+    since then is one compact line in the log. Loading replays the log tail
+    on top of the snapshot, so a write costs a single append.
+
+    With `generations` (backend.coherence.Generations) several processes can
+    share the files: writes hold the "user_data" lock and bump its
+    generation, and each process applies the records others appended
+    (tailing the log from where it last read) when it sees the bump.
+    """
+
+    def __init__(self, snapshot_path: str, log_path: str,
+                 snapshot_every: int = SNAPSHOT_EVERY, fsync_interval: float = FSYNC_INTERVAL,
+                 generations=None):
+        self.snapshot_path = snapshot_path
+        self.generations = generations
+        # What this process has read: generations seen and the log offset reached
+        self._generation = None
+        self._snapshot_generation = None
+        self._log_offset = 0
+        self.snapshot_every = snapshot_every
+        self.log = AppendLog(log_path, fsync_interval)
+        self.seq = 0
+        self._snapshot_seq = 0
+        self._data = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Derived state, rebuilt on load and maintained by each _apply_<op>
+        self.movie_aggregates: Dict[str, ReviewAggregate] = {}
+        # Per-user counters keyed by str(user_id); persisted with each snapshot
+        self.user_stats: Dict[str, Dict[str, int]] = {}
+        # Secondary indexes over user_reviews / reports / watchlists
+        self._reviews_by_id: Dict[str, Dict[str, Any]] = {}
+        self._reviews_by_movie: Dict[str, List[Dict[str, Any]]] = {}
+        self._reviews_by_user: Dict[int, List[Dict[str, Any]]] = {}
+        self._review_by_movie_user: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._reports_by_review: Dict[str, List[Dict[str, Any]]] = {}
+        self._report_keys: Set[Tuple[str, int]] = set()
+        self._watchlist_movies: Dict[str, Set[str]] = {}
+
+    def _ensure_loaded(self) -> None:
+        if self._data is None:
+            self.load()
+        elif self.generations is not None and self.generations.get("user_data") != self._generation:
+            with self._lock, self._shared_lock():
+                self._sync()
+
+    def ensure_fresh(self) -> None:
+        """Load on first use, then pick up what other processes committed"""
+        self._ensure_loaded()
+
+    def is_fresh(self) -> bool:
+        """True when reads can be answered from memory without loading or syncing (no lock, no disk)"""
+        if self._data is None:
+            return False
+        return self.generations is None or self.generations.get("user_data") == self._generation
+
+    def _shared_lock(self):
+        # Serializes writers across processes; taken after self._lock
+        return self.generations.lock("user_data") if self.generations is not None else nullcontext()
+
+    def _sync(self) -> None:
+        """Apply what other processes committed since we last looked (caller holds both locks)"""
+        if self._data is None or self.generations is None:
+            self._ensure_loaded()
+            return
+        generation = self.generations.get("user_data")
+        if generation == self._generation:
+            return
+        if self.generations.get("user_data_snapshot") != self._snapshot_generation:
+            self.load()
+            return
+        records, offset = self.log.read_from(self._log_offset)
+        if records is None:
+            self.load()
+            return
+        for record in records:
+            if record["seq"] > self.seq:
+                self._apply(record)
+                self.seq = record["seq"]
+        self._log_offset = offset
+        self._generation = generation
+
+    def _publish(self) -> None:
+        # Make this transaction's records readable, then tell the other processes
+        if self.generations is not None:
+            self._log_offset = self.log.publish()
+            self._generation = self.generations.bump("user_data")
+            if getattr(self._local, "reviews_added", False):
+                self._local.reviews_added = False
+                # Lets review consumers (the search index) skip votes, watchlists and reports
+                self.generations.bump("user_reviews")
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """The live user data (treat as read-only; change it through commit)"""
+        self._ensure_loaded()
+        return self._data
+
+    def load(self) -> None:
+        """Read the snapshot and replay every newer log record"""
+        with self._lock, self._shared_lock(), timed("json_load"):
+            if self.generations is not None:
+                self._generation = self.generations.get("user_data")
+                self._snapshot_generation = self.generations.get("user_data_snapshot")
+            data = empty_user_data()
+            seq = 0
+            if os.path.exists(self.snapshot_path):
+                try:
+                    with open(self.snapshot_path, "r") as f:
+                        data.update(json.load(f))
+                    seq = data.pop("_seq", 0)
+                except Exception as e:
+                    logger.error("Error loading user data snapshot %s: %s", self.snapshot_path, e)
+            user_stats = data.pop("_user_stats", None)
+
+            self._snapshot_seq = seq
+            self._data = data
+            self._rebuild_derived()
+            if user_stats is None:
+                self.rebuild_user_stats()
+            else:
+                self.user_stats = defaultdict(new_user_stats, user_stats)
+            records, self._log_offset = self.log.read_from(0)
+            # Drop a torn tail (a crash mid-write) before anything is appended after it
+            self.log.truncate_to(self._log_offset)
+            for record in records:
+                if record["seq"] <= self._snapshot_seq:
+                    continue
+                self._apply(record)
+                seq = record["seq"]
+            self.seq = seq
+
+    def _rebuild_derived(self) -> None:
+        self.movie_aggregates = defaultdict(ReviewAggregate)
+        self._reviews_by_id = {}
+        self._reviews_by_movie = defaultdict(list)
+        self._reviews_by_user = defaultdict(list)
+        self._review_by_movie_user = {}
+        for review in self._data["user_reviews"]:
+            self._index_review(review)
+            self.movie_aggregates[review["movie_id"]].add_review(review["rating"], review.get("helpful_votes", 0))
+
+        self._reports_by_review = defaultdict(list)
+        self._report_keys = set()
+        for report in self._data["reports"]:
+            self._index_report(report)
+
+        self._watchlist_movies = defaultdict(set)
+        for user_id, watchlist in self._data["watchlists"].items():
+            self._watchlist_movies[user_id] = {item["movie_id"] for item in watchlist}
+
+    def _index_review(self, review: Dict[str, Any]) -> None:
+        self._reviews_by_id[review["id"]] = review
+        self._reviews_by_movie[review["movie_id"]].append(review)
+        self._reviews_by_user[review["user_id"]].append(review)
+        self._review_by_movie_user[(review["movie_id"], review["user_id"])] = review
+
+    def _index_report(self, report: Dict[str, Any]) -> None:
+        self._reports_by_review[report["review_id"]].append(report)
+        self._report_keys.add((report["review_id"], report["user_id"]))
+
+    def rebuild_user_stats(self) -> Dict[str, Dict[str, int]]:
+        """Recompute every user's counters from reviews and watchlists"""
+        with self._lock:
+            stats: Dict[str, Dict[str, int]] = defaultdict(new_user_stats)
+            for review in self.data["user_reviews"]:
+                author = stats[str(review["user_id"])]
+                author["review_count"] += 1
+                author["rating_sum"] += review["rating"]
+                author["helpful_votes"] += review.get("helpful_votes", 0)
+            for user_id, watchlist in self.data["watchlists"].items():
+                if watchlist:
+                    stats[user_id]["watchlist_count"] = len(watchlist)
+            self.user_stats = stats
+            return stats
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        getattr(self, f"_apply_{record['op']}")(record)
+
+    def _apply_review(self, record: Dict[str, Any]) -> None:
+        review = record["review"]
+        self._data["user_reviews"].append(review)
+        self._index_review(review)
+        self.movie_aggregates[review["movie_id"]].add_review(review["rating"], review.get("helpful_votes", 0))
+        author = self.user_stats[str(review["user_id"])]
+        author["review_count"] += 1
+        author["rating_sum"] += review["rating"]
+        author["helpful_votes"] += review.get("helpful_votes", 0)
+
+    def _apply_vote(self, record: Dict[str, Any]) -> None:
+        review_id = record["review_id"]
+        review = self._reviews_by_id.get(review_id)
+        if record["helpful"] and review is not None:
+            review["helpful_votes"] = review.get("helpful_votes", 0) + 1
+            self.movie_aggregates[review["movie_id"]].add_votes(1)
+            self.user_stats[str(review["user_id"])]["helpful_votes"] += 1
+        self._data["review_votes"][f"{record['user_id']}_{review_id}"] = record["helpful"]
+
+    def _apply_watchlist_add(self, record: Dict[str, Any]) -> None:
+        self._data["watchlists"].setdefault(str(record["user_id"]), []).append(record["item"])
+        self._watchlist_movies[str(record["user_id"])].add(record["item"]["movie_id"])
+        self.user_stats[str(record["user_id"])]["watchlist_count"] += 1
+
+    def _apply_watchlist_remove(self, record: Dict[str, Any]) -> None:
+        key = str(record["user_id"])
+        watchlist = self._data["watchlists"].get(key, [])
+        remaining = [item for item in watchlist if item["movie_id"] != record["movie_id"]]
+        self._data["watchlists"][key] = remaining
+        self._watchlist_movies[key].discard(record["movie_id"])
+        if len(remaining) != len(watchlist):
+            self.user_stats[key]["watchlist_count"] = len(remaining)
+
+    def _apply_watchlist_batch(self, record: Dict[str, Any]) -> None:
+        # Removals first, then additions
+        key = str(record["user_id"])
+        removed = set(record["remove"])
+        watchlist = [item for item in self._data["watchlists"].get(key, []) if item["movie_id"] not in removed]
+        watchlist.extend(record["add"])
+        self._data["watchlists"][key] = watchlist
+        self._watchlist_movies[key] = {item["movie_id"] for item in watchlist}
+        self.user_stats[key]["watchlist_count"] = len(watchlist)
+
+    def _apply_report(self, record: Dict[str, Any]) -> None:
+        self._data["reports"].append(record["report"])
+        self._index_report(record["report"])
+
+    # Indexed lookups
+
+    def get_review(self, review_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._reviews_by_id.get(review_id)
+
+    def reviews_for_movie(self, movie_id: str) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._reviews_by_movie.get(movie_id, [])
+
+    def reviews_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._reviews_by_user.get(user_id, [])
+
+    def user_review_for_movie(self, movie_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._review_by_movie_user.get((movie_id, user_id))
+
+    def reports_for_review(self, review_id: str) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._reports_by_review.get(review_id, [])
+
+    def has_reported(self, review_id: str, user_id: int) -> bool:
+        self._ensure_loaded()
+        return (review_id, user_id) in self._report_keys
+
+    def has_voted(self, review_id: str, user_id: int) -> bool:
+        return f"{user_id}_{review_id}" in self.data["review_votes"]
+
+    def movie_aggregate(self, movie_id: str) -> Optional[ReviewAggregate]:
+        self._ensure_loaded()
+        return self.movie_aggregates.get(movie_id)
+
+    def stats_for_user(self, user_id: int) -> Optional[Dict[str, int]]:
+        self._ensure_loaded()
+        return self.user_stats.get(str(user_id))
+
+    def watchlist(self, user_id: int) -> List[Dict[str, Any]]:
+        """A copy of the user's watchlist, oldest first"""
+        with self._lock:
+            return list(self.data["watchlists"].get(str(user_id), []))
+
+    def all_reviews(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.data["user_reviews"])
+
+    def reviews_since(self, cursor: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """User reviews added after `cursor` (0 for all of them) and the cursor for the next call"""
+        with self._lock:
+            reviews = self.data["user_reviews"]
+            if cursor > len(reviews):
+                # The data was replaced wholesale since
+                cursor = 0
+            return reviews[cursor:], len(reviews)
+
+    def next_review_id(self) -> str:
+        """Id for the next review; call inside transaction() so it cannot be taken meanwhile"""
+        return f"user_review_{len(self.data['user_reviews']) + 1}"
+
+    def in_watchlist(self, user_id: int, movie_id: str) -> bool:
+        self._ensure_loaded()
+        return movie_id in self._watchlist_movies.get(str(user_id), ())
+
+    @contextmanager
+    def transaction(self, wait: bool = True):
+        """Hold the write lock across a check-then-commit sequence.
+
+        Commits made inside are applied immediately; waiting for them to be
+        flushed happens after the lock is released, so concurrent
+        transactions share one group commit. With wait=False the caller
+        gets the tickets and finishes them itself (see finish_async).
+        """
+        with self._lock, self._shared_lock():
+            outer = getattr(self._local, "tickets", None)
+            if outer is None:
+                self._sync()
+            tickets = outer if outer is not None else []
+            self._local.tickets = tickets
+            seq = self.seq
+            try:
+                yield tickets
+            finally:
+                self._local.tickets = outer
+                if outer is None and self.seq != seq:
+                    self._publish()
+        if outer is None and wait:
+            self.finish(tickets)
+
+    def finish(self, tickets: List[int]) -> None:
+        """Wait for the given commits to be flushed, then snapshot if one is due"""
+        if tickets:
+            self.log.commit(max(tickets))
+        if self._snapshot_due():
+            with self._lock, self._shared_lock():
+                self._sync()
+                if self._snapshot_due():
+                    self.snapshot()
+
+    async def finish_async(self, tickets: List[int]) -> None:
+        """finish() on the I/O executor; returns at once when there is nothing to write"""
+        if tickets or self._snapshot_due():
+            await run_io(self.finish, tickets)
+
+    def _snapshot_due(self) -> bool:
+        return self.seq - self._snapshot_seq >= self.snapshot_every
+
+    def commit(self, op: str, **fields: Any) -> None:
+        """Append one mutation to the log and apply it in memory.
+
+        Outside a transaction this waits for the flush; inside one the
+        wait happens when the transaction ends.
+        """
+        with self.transaction():
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown user data operation: {op}")
+            self._ensure_loaded()
+            record = {"seq": self.seq + 1, "op": op, **fields}
+            ticket = self.log.append(record)
+            self._apply(record)
+            self.seq += 1
+            self._local.tickets.append(ticket)
+            if op == "review":
+                self._local.reviews_added = True
+
+    def snapshot(self) -> None:
+        """Write the full state to the snapshot file and start a new log"""
+        with self._lock, self._shared_lock():
+            self._sync()
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        # Caller holds both locks; self._data is what gets written, as is
+        self.log.sync()
+        snapshot = {**self._data, "_seq": self.seq, "_user_stats": self.user_stats}
+        atomic_write_json(self.snapshot_path, snapshot, separators=(",", ":"))
+        self.log.truncate()
+        self._snapshot_seq = self.seq
+        self._log_offset = 0
+        if self.generations is not None:
+            self._snapshot_generation = self.generations.bump("user_data_snapshot")
+            self._generation = self.generations.bump("user_data")
+
+    def replace(self, data: Dict[str, Any]) -> None:
+        """Swap in a whole new state (used by bulk edits and migrations)"""
+        with self._lock, self._shared_lock():
+            self._sync()
+            self._data = data
+            self._rebuild_derived()
+            self.rebuild_user_stats()
+            self.seq += 1
+            self._write_snapshot()
+            if self.generations is not None:
+                self.generations.bump("user_reviews")
+
+    def close(self) -> None:
+        self.log.close()
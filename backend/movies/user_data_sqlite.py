@@ -0,0 +1,314 @@
+# backend/movies/user_data_sqlite.py
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from .aggregates import ReviewAggregate
+from .user_data import OPERATIONS, empty_user_data, new_user_stats
+
+logger = logging.getLogger(__name__)
+
+REVIEW_COLUMNS = (
+    "id", "movie_id", "user_id", "username", "date_of_review", "usefulness_vote", "total_votes",
+    "rating", "review_title", "review_text", "helpful_votes", "created_at",
+)
+REPORT_COLUMNS = ("review_id", "user_id", "username", "reason", "reported_at", "status")
+
+
+def _review(row) -> Dict[str, Any]:
+    review = {name: row[name] for name in REVIEW_COLUMNS}
+    review["is_dataset_review"] = False
+    return review
+
+
+def _review_seq(review_id: str) -> Optional[int]:
+    # user_review_<n> keeps <n> as its row id so new ids continue after it
+    suffix = review_id.rpartition("_")[2]
+    return int(suffix) if review_id.startswith("user_review_") and suffix.isdigit() else None
+
+
+class SQLiteUserDataStore:
+    """UserDataStore over the SQLite tables in backend.database.
+
+    Every commit is a row-level write inside a BEGIN IMMEDIATE transaction,
+    so several worker processes can write at once; uniqueness rules
+    (one review per user and movie, one vote, one report, no duplicate
+    watchlist entries) are table constraints.
+    """
+
+    def __init__(self, db, generations=None):
+        self.db = db
+        self.snapshot_path = db.path
+        # Commits bump the shared "user_data" generation for other workers' derived caches
+        self.generations = generations
+        self._local = threading.local()
+
+    # Lifecycle: the database is always current, so these are cheap
+
+    def load(self) -> None:
+        self.db.connection
+
+    def close(self) -> None:
+        self.db.close()
+
+    def snapshot(self) -> None:
+        """Checkpoint the WAL into the main file"""
+        self.db.checkpoint()
+
+    def ensure_fresh(self) -> None:
+        # Reads always go to the database
+        pass
+
+    def is_fresh(self) -> bool:
+        # Every read is a query, so none of them belong on the event loop
+        return False
+
+    def finish(self, tickets: List[int]) -> None:
+        pass
+
+    async def finish_async(self, tickets: List[int]) -> None:
+        # COMMIT already made the writes durable
+        pass
+
+    @property
+    def seq(self) -> int:
+        """Number of committed mutations; shared by every process using the file"""
+        row = self.db.connection.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        return row[0] if row else 0
+
+    # Reads
+
+    def _query(self, sql: str, *params: Any):
+        return self.db.connection.execute(sql, params)
+
+    def get_review(self, review_id: str) -> Optional[Dict[str, Any]]:
+        row = self._query("SELECT * FROM user_reviews WHERE id = ?", review_id).fetchone()
+        return _review(row) if row else None
+
+    def reviews_for_movie(self, movie_id: str) -> List[Dict[str, Any]]:
+        return [_review(r) for r in self._query("SELECT * FROM user_reviews WHERE movie_id = ? ORDER BY seq", movie_id)]
+
+    def reviews_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        return [_review(r) for r in self._query("SELECT * FROM user_reviews WHERE user_id = ? ORDER BY seq", user_id)]
+
+    def all_reviews(self) -> List[Dict[str, Any]]:
+        return [_review(r) for r in self._query("SELECT * FROM user_reviews ORDER BY seq")]
+
+    def reviews_since(self, cursor: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """User reviews added after `cursor` (a row seq; 0 for all of them) and the cursor for the next call"""
+        rows = self._query("SELECT * FROM user_reviews WHERE seq > ? ORDER BY seq", cursor).fetchall()
+        return [_review(r) for r in rows], (rows[-1]["seq"] if rows else cursor)
+
+    def user_review_for_movie(self, movie_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        row = self._query("SELECT * FROM user_reviews WHERE movie_id = ? AND user_id = ?", movie_id, user_id).fetchone()
+        return _review(row) if row else None
+
+    def reports_for_review(self, review_id: str) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._query(
+            f"SELECT {', '.join(REPORT_COLUMNS)} FROM reports WHERE review_id = ? ORDER BY id", review_id
+        )]
+
+    def has_reported(self, review_id: str, user_id: int) -> bool:
+        return self._query("SELECT 1 FROM reports WHERE review_id = ? AND user_id = ?", review_id, user_id).fetchone() is not None
+
+    def has_voted(self, review_id: str, user_id: int) -> bool:
+        return self._query("SELECT 1 FROM review_votes WHERE review_id = ? AND user_id = ?", review_id, user_id).fetchone() is not None
+
+    def movie_aggregate(self, movie_id: str) -> Optional[ReviewAggregate]:
+        rows = self._query(
+            "SELECT rating, COUNT(*) AS n, SUM(helpful_votes) AS votes FROM user_reviews WHERE movie_id = ? GROUP BY rating",
+            movie_id,
+        ).fetchall()
+        if not rows:
+            return None
+        aggregate = ReviewAggregate()
+        for row in rows:
+            aggregate.review_count += row["n"]
+            aggregate.usefulness_votes += row["votes"]
+            if 1 <= row["rating"] <= 10:
+                aggregate.rated_count += row["n"]
+                aggregate.rating_sum += row["rating"] * row["n"]
+                aggregate.histogram[row["rating"] - 1] += row["n"]
+        return aggregate
+
+    def stats_for_user(self, user_id: int) -> Optional[Dict[str, int]]:
+        row = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(rating), 0), COALESCE(SUM(helpful_votes), 0) FROM user_reviews WHERE user_id = ?",
+            user_id,
+        ).fetchone()
+        watchlist_count = self._query("SELECT COUNT(*) FROM watchlists WHERE user_id = ?", user_id).fetchone()[0]
+        if not row[0] and not watchlist_count:
+            return None
+        return {"review_count": row[0], "rating_sum": row[1], "helpful_votes": row[2], "watchlist_count": watchlist_count}
+
+    def in_watchlist(self, user_id: int, movie_id: str) -> bool:
+        return self._query("SELECT 1 FROM watchlists WHERE user_id = ? AND movie_id = ?", user_id, movie_id).fetchone() is not None
+
+    def watchlist(self, user_id: int) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._query(
+            "SELECT movie_id, added_at, movie_title FROM watchlists WHERE user_id = ? ORDER BY position", user_id
+        )]
+
+    def next_review_id(self) -> str:
+        """Id for the next review; stable while the caller's transaction holds the write lock"""
+        row = self._query("SELECT seq FROM sqlite_sequence WHERE name = 'user_reviews'").fetchone()
+        return f"user_review_{(row[0] if row else 0) + 1}"
+
+    def rebuild_user_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-user counters, computed from the tables (nothing is cached to rebuild)"""
+        stats: Dict[str, Dict[str, int]] = defaultdict(new_user_stats)
+        for row in self._query(
+            "SELECT user_id, COUNT(*), SUM(rating), SUM(helpful_votes) FROM user_reviews GROUP BY user_id"
+        ):
+            stats[str(row[0])].update(review_count=row[1], rating_sum=row[2], helpful_votes=row[3])
+        for row in self._query("SELECT user_id, COUNT(*) FROM watchlists GROUP BY user_id"):
+            stats[str(row[0])]["watchlist_count"] = row[1]
+        return dict(stats)
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Everything, in the user_data.json layout (for exports; not a live view)"""
+        data = empty_user_data()
+        data["user_reviews"] = self.all_reviews()
+        for row in self._query("SELECT * FROM watchlists ORDER BY position"):
+            data["watchlists"].setdefault(str(row["user_id"]), []).append(
+                {"movie_id": row["movie_id"], "added_at": row["added_at"], "movie_title": row["movie_title"]}
+            )
+        for row in self._query("SELECT * FROM review_votes"):
+            data["review_votes"][f"{row['user_id']}_{row['review_id']}"] = bool(row["helpful"])
+        data["reports"] = [dict(r) for r in self._query(f"SELECT {', '.join(REPORT_COLUMNS)} FROM reports ORDER BY id")]
+        for row in self._query("SELECT * FROM penalties"):
+            data["penalties"][row["user_id"]] = json.loads(row["data"])
+        return data
+
+    # Writes
+
+    @contextmanager
+    def transaction(self, wait: bool = True):
+        """Hold the database write lock across a check-then-commit sequence"""
+        try:
+            with self.db.transaction():
+                yield []
+        except BaseException:
+            if not self.db.in_transaction():
+                self._local.dirty = self._local.reviews_dirty = False
+            raise
+        self._publish()
+
+    def commit(self, op: str, **fields: Any) -> None:
+        """Apply one mutation (see user_data.OPERATIONS) as row-level writes"""
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown user data operation: {op}")
+        with self.db.transaction() as conn:
+            getattr(self, f"_commit_{op}")(conn, **fields)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('seq', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+            self._local.dirty = True
+            if op == "review":
+                self._local.reviews_dirty = True
+        self._publish()
+
+    def _publish(self) -> None:
+        # Only once the outermost transaction has committed, so other workers can see the rows
+        if self.generations is not None and not self.db.in_transaction() and getattr(self._local, "dirty", False):
+            self._local.dirty = False
+            self.generations.bump("user_data")
+            if getattr(self._local, "reviews_dirty", False):
+                self._local.reviews_dirty = False
+                self.generations.bump("user_reviews")
+
+    def _insert_review(self, conn, review: Dict[str, Any]) -> int:
+        values = [review.get(name) for name in REVIEW_COLUMNS]
+        return conn.execute(
+            f"INSERT OR IGNORE INTO user_reviews (seq, {', '.join(REVIEW_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(REVIEW_COLUMNS) + 1))})",
+            [_review_seq(review["id"]), *values],
+        ).rowcount
+
+    def _commit_review(self, conn, review: Dict[str, Any]) -> None:
+        self._insert_review(conn, review)
+
+    def _commit_vote(self, conn, review_id: str, user_id: int, helpful: bool) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO review_votes (review_id, user_id, helpful) VALUES (?, ?, ?)",
+            (review_id, user_id, int(helpful)),
+        )
+        if helpful:
+            conn.execute("UPDATE user_reviews SET helpful_votes = helpful_votes + 1 WHERE id = ?", (review_id,))
+
+    def _insert_watchlist_item(self, conn, user_id: int, item: Dict[str, Any]) -> int:
+        return conn.execute(
+            "INSERT OR IGNORE INTO watchlists (user_id, movie_id, added_at, movie_title) VALUES (?, ?, ?, ?)",
+            (user_id, item["movie_id"], item["added_at"], item.get("movie_title")),
+        ).rowcount
+
+    def _commit_watchlist_add(self, conn, user_id: int, item: Dict[str, Any]) -> None:
+        self._insert_watchlist_item(conn, user_id, item)
+
+    def _commit_watchlist_remove(self, conn, user_id: int, movie_id: str) -> None:
+        conn.execute("DELETE FROM watchlists WHERE user_id = ? AND movie_id = ?", (user_id, movie_id))
+
+    def _commit_watchlist_batch(self, conn, user_id: int, add: List[Dict[str, Any]], remove: List[str]) -> None:
+        conn.executemany("DELETE FROM watchlists WHERE user_id = ? AND movie_id = ?", [(user_id, m) for m in remove])
+        for item in add:
+            self._insert_watchlist_item(conn, user_id, item)
+
+    def _insert_report(self, conn, report: Dict[str, Any]) -> int:
+        return conn.execute(
+            f"INSERT OR IGNORE INTO reports ({', '.join(REPORT_COLUMNS)}) VALUES ({', '.join('?' * len(REPORT_COLUMNS))})",
+            [report.get(name) for name in REPORT_COLUMNS[:-1]] + [report.get("status", "pending")],
+        ).rowcount
+
+    def _commit_report(self, conn, report: Dict[str, Any]) -> None:
+        self._insert_report(conn, report)
+
+    def import_data(self, data: Dict[str, Any]) -> Dict[str, int]:
+        """Copy a user_data.json-shaped dict into the tables.
+
+        Rows that break a constraint (e.g. a second review of the same movie
+        by the same user) are skipped and counted.
+        """
+        counts = {"reviews": 0, "votes": 0, "watchlist_items": 0, "reports": 0, "penalties": 0, "skipped": 0}
+        with self.db.transaction() as conn:
+            for review in data.get("user_reviews", []):
+                added = self._insert_review(conn, review)
+                counts["reviews"] += added
+                counts["skipped"] += 1 - added
+            for key, helpful in data.get("review_votes", {}).items():
+                user_id, _, review_id = key.partition("_")
+                conn.execute(
+                    "INSERT OR REPLACE INTO review_votes (review_id, user_id, helpful) VALUES (?, ?, ?)",
+                    (review_id, int(user_id), int(helpful)),
+                )
+                counts["votes"] += 1
+            for user_id, items in data.get("watchlists", {}).items():
+                for item in items:
+                    added = self._insert_watchlist_item(conn, int(user_id), item)
+                    counts["watchlist_items"] += added
+                    counts["skipped"] += 1 - added
+            for report in data.get("reports", []):
+                added = self._insert_report(conn, report)
+                counts["reports"] += added
+                counts["skipped"] += 1 - added
+            for user_id, penalty in data.get("penalties", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO penalties (user_id, data) VALUES (?, ?)", (str(user_id), json.dumps(penalty))
+                )
+                counts["penalties"] += 1
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('seq', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+        return counts
+
+    def replace(self, data: Dict[str, Any]) -> None:
+        """Swap in a whole new state (used by bulk edits and migrations)"""
+        with self.db.transaction() as conn:
+            for table in ("user_reviews", "review_votes", "watchlists", "reports", "penalties"):
+                conn.execute(f"DELETE FROM {table}")
+            self.import_data(data)
+            self._local.dirty = self._local.reviews_dirty = True
+        self._publish()
@@ -1,156 +1,430 @@
 # backend/movies/utils.py
-import json
-import csv
 import os
-from typing import List, Dict, Any
+import threading
+import heapq
+from itertools import islice
+import logging
+from typing import List, Dict, Any, Generator, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 
-# Simple relative path from project root
-MOVIES_DATA_DIR = "backend/data/movie_list"
+from backend import database, metrics
+from backend.coherence import generations
+from backend.storage import DATA_DIR, run_io
+from . import reviews
+from .aggregates import DatasetAggregates, ReviewAggregate
+from .catalog import MovieCatalog
+from .http_cache import make_etag
+from .ingest import INGEST_WORKERS, IngestReport, ingest
+from .packed import PackedDataset
+from .review_order import REVIEW_SORT_KEYS, ReviewOrderings, merge_user_reviews
+from .review_search import ReviewSearchIndex
+from .search import MovieSearchIndex
+from .user_data import UserDataStore
+from .user_data_sqlite import SQLiteUserDataStore
+
+logger = logging.getLogger(__name__)
+
+# Relative to the project root unless DATA_DIR says otherwise
+MOVIES_DATA_DIR = os.path.join(DATA_DIR, "movie_list")
+
+# Compiled copy of movie_list (python -m backend.cli compile-dataset); optional
+PACKED_DATASET_FILE = os.path.join(DATA_DIR, "movie_list.pack")
+packed_dataset = PackedDataset(PACKED_DATASET_FILE)
+
+# Shared by every request in this process
+catalog = MovieCatalog(MOVIES_DATA_DIR, packed=packed_dataset, generations=generations)
+metrics.gauge("catalog_movies", "Movies in the in-memory catalog", lambda: catalog.count)
+metrics.gauge("catalog_version", "Times the catalog changed since startup", lambda: catalog.version)
+
+_search_index: Optional[MovieSearchIndex] = None
+_search_index_lock = threading.Lock()
 
 def load_all_movies() -> List[Dict[str, Any]]:
-    """Load all movies from the data directory"""
-    movies = []
-    
-    print(f"Loading movies from: {MOVIES_DATA_DIR}")
-    print(f"Full path: {os.path.abspath(MOVIES_DATA_DIR)}")
-    
-    if not os.path.exists(MOVIES_DATA_DIR):
-        print(f"❌ Directory not found: {MOVIES_DATA_DIR}")
-        return movies
-    
-    movie_folders = os.listdir(MOVIES_DATA_DIR)
-    print(f"Found {len(movie_folders)} movie folders")
-    
-    for movie_folder in movie_folders:
-        movie_path = f"{MOVIES_DATA_DIR}/{movie_folder}"
-        
-        # Only process folders
-        if not os.path.isdir(movie_path):
-            continue
-            
-        # Load metadata
-        metadata_file = f"{movie_path}/metadata.json"
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    metadata['id'] = movie_folder
-                    movies.append(metadata)
-                print(f"✅ {movie_folder}")
-            except Exception as e:
-                print(f"❌ Error loading {movie_folder}: {e}")
-        else:
-            print(f"❌ No metadata.json in {movie_folder}")
-            
-    print(f"Successfully loaded {len(movies)} movies")
-    return movies
+    """Load all movies from the in-memory catalog"""
+    return catalog.all()
+
+def get_movie(movie_id: str) -> Optional[Dict[str, Any]]:
+    """Look up a single movie by id"""
+    return catalog.get(movie_id)
+
+def _reviews_stamp(movie_id: str):
+    stamps = catalog.stamps(movie_id)
+    return stamps[1] if stamps else None
+
+def iter_dataset_reviews(movie_id: str, start: int = 0) -> Generator[Dict[str, Any], None, int]:
+    """Dataset reviews from the packed dataset when it is current for this movie, else from the CSV"""
+    stamp = _reviews_stamp(movie_id)
+    if packed_dataset.has_reviews(movie_id, stamp):
+        return (yield from packed_dataset.iter_reviews(movie_id, stamp, start))
+    return (yield from reviews.iter_dataset_reviews(MOVIES_DATA_DIR, movie_id, start=start))
 
 def load_movie_reviews(movie_id: str) -> List[Dict[str, Any]]:
     """Load reviews for a specific movie from CSV"""
-    reviews_file = f"{MOVIES_DATA_DIR}/{movie_id}/movieReviews.csv"
-    reviews = []
-    
-    if os.path.exists(reviews_file):
-        try:
-            with open(reviews_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for i, row in enumerate(reader):
-                    # Clean the rating field
-                    rating_str = row["User's Rating out of 10"].strip()
-                    try:
-                        rating = int(rating_str) if rating_str and rating_str != '"' else 0
-                    except ValueError:
-                        rating = 0
-                    
-                    review = {
-                        'id': f"{movie_id}_review_{i}",
-                        'movie_id': movie_id,
-                        'date_of_review': row['Date of Review'],
-                        'username': row['User'],
-                        'usefulness_vote': int(row['Usefulness Vote']),
-                        'total_votes': int(row['Total Votes']),
-                        'rating': rating,
-                        'review_title': row['Review Title'],
-                        'review_text': row.get('Review Text', ''),
-                        'helpful_votes': 0,
-                        'is_dataset_review': True
-                    }
-                    reviews.append(review)
-        except Exception as e:
-            print(f"Error loading reviews for {movie_id}: {e}")
-    
-    return reviews
+    return list(iter_dataset_reviews(movie_id))
+
+def iter_movie_reviews(movie_id: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """Lazily yield dataset reviews (CSV order) followed by user reviews, starting at offset"""
+    dataset_count = yield from iter_dataset_reviews(movie_id, start=offset)
+    user_reviews = user_data_store.reviews_for_movie(movie_id)
+    yield from user_reviews[max(0, offset - dataset_count):]
+
+# Per-movie presorted review orderings, built once per CSV version
+review_orderings = ReviewOrderings(MOVIES_DATA_DIR, packed=packed_dataset)
+
+def iter_sorted_reviews(movie_id: str, sort: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """Dataset and user reviews in REVIEW_SORT_KEYS order from offset on; only rows that are yielded get read"""
+    entries = islice(
+        merge_user_reviews(review_orderings.get(movie_id), sort, user_data_store.reviews_for_movie(movie_id)),
+        offset, None,
+    )
+    stamp = _reviews_stamp(movie_id)
+    if packed_dataset.has_reviews(movie_id, stamp):
+        def read(row):
+            return packed_dataset.read_review(movie_id, stamp, row)
+        reader = None
+    else:
+        reader = reviews.DatasetRowReader(MOVIES_DATA_DIR, movie_id)
+        read = reader.read
+    try:
+        for _, row, review in entries:
+            review = review if review is not None else read(row)
+            # None only if the CSV changed between ordering and reading
+            if review is not None:
+                yield review
+    finally:
+        if reader is not None:
+            reader.close()
+
+def get_review(movie_id: str, review_id: str) -> Optional[Dict[str, Any]]:
+    """Look up one review of a movie; dataset reviews are fetched by row offset"""
+    prefix = f"{movie_id}_review_"
+    if review_id.startswith(prefix) and review_id[len(prefix):].isdigit():
+        row = int(review_id[len(prefix):])
+        stamp = _reviews_stamp(movie_id)
+        if packed_dataset.has_reviews(movie_id, stamp):
+            return packed_dataset.read_review(movie_id, stamp, row)
+        return reviews.read_dataset_review(MOVIES_DATA_DIR, movie_id, row)
+
+    review = user_data_store.get_review(review_id)
+    return review if review and review["movie_id"] == movie_id else None
+
+def _rebuild_search_index() -> None:
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None or _search_index.version != catalog.version:
+            _search_index = MovieSearchIndex(catalog.all(), catalog.version)
+
+# Rebuilt by whichever thread installs a catalog change (the background
+# rescan, a reload, the startup seed), never by a request
+catalog.add_listener(_rebuild_search_index)
+
+def get_search_index() -> MovieSearchIndex:
+    """Search index for the current catalog; the previous one is served while a rebuild runs"""
+    catalog.ensure_fresh()
+    if _search_index is None:
+        _rebuild_search_index()
+    return _search_index
 
 def search_movies(
     query: str = None, 
     genre: str = None, 
     min_rating: float = None,
-    year: int = None
+    year: int = None,
+    sort: str = None,
+    limit: int = None
 ) -> List[Dict[str, Any]]:
     """Search and filter movies"""
-    movies = load_all_movies()
-    
-    filtered_movies = movies
-    
-    if query:
-        filtered_movies = [m for m in filtered_movies if query.lower() in m['title'].lower()]
-    
-    if genre:
-        filtered_movies = [m for m in filtered_movies if any(genre.lower() in g.lower() for g in m['movieGenres'])]
-    
-    if min_rating:
-        filtered_movies = [m for m in filtered_movies if m['movieIMDbRating'] >= min_rating]
-    
-    if year:
-        filtered_movies = [m for m in filtered_movies if str(year) in m['datePublished']]
-    
-    return filtered_movies
+    return get_search_index().search(query, genre, min_rating, year, sort, limit)
+
+# Full-text index over review text
+REVIEW_SEARCH_INDEX_FILE = os.path.join(DATA_DIR, "review_search.idx")
+
+review_search_index = ReviewSearchIndex(REVIEW_SEARCH_INDEX_FILE)
+# Catalog fingerprint (metadata and review CSV stamps) last checked against the index
+_review_search_catalog_fingerprint = None
+# "user_reviews" generation whose reviews are all in the index, and the
+# store cursor (see reviews_since) just past the last one fed to it
+_review_search_user_generation = None
+_review_search_user_cursor = 0
+_review_search_lock = threading.Lock()
+
+def _review_sources() -> Dict[str, List[int]]:
+    """(size, mtime) of every dataset review CSV, used to detect a stale index"""
+    sources = {}
+    for movie in catalog.all():
+        try:
+            stat = os.stat(reviews.reviews_file(MOVIES_DATA_DIR, movie["id"]))
+        except FileNotFoundError:
+            continue
+        sources[movie["id"]] = [stat.st_size, stat.st_mtime_ns]
+    return sources
+
+def _iter_dataset_reviews(movie_ids: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for movie_id in movie_ids:
+        yield from iter_dataset_reviews(movie_id)
+
+def get_review_search_index(rebuild: bool = False) -> ReviewSearchIndex:
+    """Review search index, loaded on first use and rebuilt when dataset CSVs change.
+
+    Reviews submitted through other workers are added when the shared
+    user_reviews generation moves; only reviews past the last cursor are
+    fetched, so a bump (including our own) costs O(new reviews).
+    """
+    global _review_search_catalog_fingerprint, _review_search_user_generation, _review_search_user_cursor
+    catalog.ensure_fresh()
+    index = review_search_index
+    if rebuild or not index.loaded or _review_search_catalog_fingerprint != catalog.fingerprint:
+        with _review_search_lock:
+            fingerprint = catalog.fingerprint
+            if rebuild or not index.loaded or _review_search_catalog_fingerprint != fingerprint:
+                sources = _review_sources()
+                if rebuild or not index.loaded or sources != index.sources:
+                    _review_search_user_generation = generations.get("user_reviews")
+                    user_reviews, _review_search_user_cursor = user_data_store.reviews_since(0)
+                    index.load(
+                        sources,
+                        lambda: _iter_dataset_reviews(sources),
+                        user_reviews,
+                        rebuild=rebuild
+                    )
+                _review_search_catalog_fingerprint = fingerprint
+    if generations.get("user_reviews") != _review_search_user_generation:
+        with _review_search_lock:
+            generation = generations.get("user_reviews")
+            if generation != _review_search_user_generation:
+                user_reviews, _review_search_user_cursor = user_data_store.reviews_since(_review_search_user_cursor)
+                # add() skips reviews already indexed (e.g. by index_user_review)
+                for review in user_reviews:
+                    index.add(review)
+                _review_search_user_generation = generation
+    return index
+
+_review_search_warmup: Optional[threading.Thread] = None
+
+def _warm_review_search() -> None:
+    try:
+        get_review_search_index()
+    except Exception:
+        logger.exception("Loading the review search index failed")
+
+def start_review_search_warmup() -> None:
+    """Load (or build) the review search index on a background thread instead of in the first search"""
+    global _review_search_warmup
+    if _review_search_warmup is None and not review_search_index.loaded:
+        _review_search_warmup = threading.Thread(target=_warm_review_search, name="review-search-warmup", daemon=True)
+        _review_search_warmup.start()
+
+def review_search_ready() -> bool:
+    """False while the startup load of the review search index is still running"""
+    warmup = _review_search_warmup
+    return review_search_index.loaded or warmup is None or not warmup.is_alive()
+
+def search_reviews(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """BM25-ranked reviews matching a free-text query"""
+    hits = get_review_search_index().search(query, limit)
+    return [{"movie_id": movie_id, "review_id": review_id, "score": round(score, 4)}
+            for score, movie_id, review_id in hits]
+
+def index_user_review(review: Dict[str, Any]) -> None:
+    """Add a newly submitted review to the search index (if it has been loaded)"""
+    if review_search_index.loaded:
+        review_search_index.add(review)
 
 # User data storage for transactions
-USER_DATA_FILE = "backend/data/user_data.json"
+USER_DATA_FILE = os.path.join(DATA_DIR, "user_data.json")
+USER_DATA_LOG_FILE = os.path.join(DATA_DIR, "user_data.log")
+
+# Snapshot + transaction log by default; SQLite tables with STORAGE_BACKEND=sqlite
+if database.STORAGE_BACKEND == "sqlite":
+    user_data_store = SQLiteUserDataStore(database.get_database(), generations=generations)
+else:
+    user_data_store = UserDataStore(USER_DATA_FILE, USER_DATA_LOG_FILE, generations=generations)
 
 def load_user_data() -> Dict[str, Any]:
     """Load user-generated data (reviews, watchlist, etc.)"""
-    if os.path.exists(USER_DATA_FILE):
-        try:
-            with open(USER_DATA_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading user data: {e}")
-    
-    return {
-        "user_reviews": [],
-        "watchlists": {},
-        "review_votes": {},
-        "reports": [],
-        "penalties": {}
-    }
+    return user_data_store.data
 
 def save_user_data(user_data: Dict[str, Any]):
-    """Save user-generated data"""
-    try:
-        os.makedirs(os.path.dirname(USER_DATA_FILE), exist_ok=True)
-        with open(USER_DATA_FILE, 'w') as f:
-            json.dump(user_data, f, indent=2)
-    except Exception as e:
-        print(f"Error saving user data: {e}")
+    """Replace all user-generated data with a new snapshot"""
+    user_data_store.replace(user_data)
+
+def user_data_transaction(wait: bool = True):
+    """Context manager serializing a read-check-commit cycle on user data.
+
+    It blocks on the store (and database) locks, so async handlers run the
+    transaction on the I/O executor with wait=False and then await
+    flush_user_data(tickets) for the group commit.
+    """
+    return user_data_store.transaction(wait)
+
+async def flush_user_data(tickets: List[int]) -> None:
+    """Wait until the commits of a wait=False transaction are on disk"""
+    await user_data_store.finish_async(tickets)
+
+def commit_user_data(op: str, **fields: Any) -> None:
+    """Record a single mutation (see user_data.OPERATIONS) in the transaction log"""
+    user_data_store.commit(op, **fields)
+
+def movies_etag(include_stats: bool = False) -> str:
+    """Validator for movie listings: the catalog fingerprint, plus the user-data seq when stats are included"""
+    catalog.ensure_fresh()
+    if include_stats:
+        user_data_store.ensure_fresh()
+        return make_etag("movies", catalog.fingerprint, user_data_store.seq)
+    return make_etag("movies", catalog.fingerprint)
+
+def movie_etag(movie_id: str) -> Optional[str]:
+    """Validator for one movie's metadata (None if the movie is unknown)"""
+    stamps = catalog.stamps(movie_id)
+    return make_etag("movie", movie_id, stamps[0]) if stamps else None
+
+def reviews_etag(movie_id: str) -> Optional[str]:
+    """Validator for a movie's review listing: its CSV stamp and user review/vote counts"""
+    stamps = catalog.stamps(movie_id)
+    if stamps is None:
+        return None
+    user_aggregate = user_data_store.movie_aggregate(movie_id)
+    user_version = (user_aggregate.review_count, user_aggregate.usefulness_votes) if user_aggregate else (0, 0)
+    return make_etag("reviews", movie_id, stamps[1], user_version)
+
+# Accepted values for ?sort= on the watchlist
+WATCHLIST_SORT_KEYS = ("added_at", "added_at_desc", "title", "rating_desc", "rating_asc")
+
+def get_watchlist(
+    user_id: int,
+    sort: str = "added_at",
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """One page of a user's watchlist joined with catalog data, and whether more follow.
+
+    Items whose movie is no longer in the catalog are left out.
+    """
+    index = get_search_index()
+    items = [item for item in user_data_store.watchlist(user_id) if item["movie_id"] in catalog]
+    end = offset + limit if limit is not None else None
+    has_more = end is not None and len(items) > end
+
+    if sort == "added_at_desc":
+        items.reverse()
+    elif sort != "added_at":
+        rank = index.rank_key(sort)
+
+        def key(item):
+            return rank(item["movie_id"])
+        if end is not None and end < len(items):
+            items = heapq.nsmallest(end, items, key=key)
+        else:
+            items.sort(key=key)
+
+    page = items[offset:end]
+    enriched = []
+    for item in page:
+        movie = catalog.get(item["movie_id"])
+        enriched.append({
+            **item,
+            "movie_title": movie["title"],
+            "movie_year": movie["datePublished"][:4],
+            "movie_rating": movie["movieIMDbRating"]
+        })
+    return enriched, has_more
+
+# Rating/usefulness totals per dataset CSV, computed once per CSV version
+dataset_aggregates = DatasetAggregates(MOVIES_DATA_DIR, packed=packed_dataset)
+
+def get_movie_stats(movie_id: str) -> Dict[str, Any]:
+    """Review count, mean rating, 1-10 histogram and usefulness votes (dataset + user reviews)"""
+    user_aggregate = user_data_store.movie_aggregate(movie_id) or ReviewAggregate()
+    return dataset_aggregates.get(movie_id).merged(user_aggregate).to_dict()
+
+def cached_movie_stats(movie_id: str) -> Optional[Dict[str, Any]]:
+    """get_movie_stats from memory only; None if the dataset aggregate still has to be computed"""
+    stamp = _reviews_stamp(movie_id)
+    if stamp is None:
+        dataset_aggregate = ReviewAggregate()
+    else:
+        mtime_ns, size = stamp
+        dataset_aggregate = dataset_aggregates.cached(movie_id, size, mtime_ns)
+        if dataset_aggregate is None:
+            return None
+    user_aggregate = user_data_store.movie_aggregate(movie_id) or ReviewAggregate()
+    return dataset_aggregate.merged(user_aggregate).to_dict()
+
+async def read_user_data_async(func, *args: Any) -> Any:
+    """Call a user-data read inline when the store can answer from memory, else on the I/O executor"""
+    if user_data_store.is_fresh():
+        return func(*args)
+    return await run_io(func, *args)
+
+async def get_movie_stats_async(movie_id: str) -> Dict[str, Any]:
+    """get_movie_stats that only leaves the event loop when a CSV has to be read or user data synced"""
+    return (await get_many_movie_stats_async([movie_id]))[0]
+
+def _many_movie_stats(movie_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    return {movie_id: get_movie_stats(movie_id) for movie_id in movie_ids}
+
+async def get_many_movie_stats_async(movie_ids: List[str]) -> List[Dict[str, Any]]:
+    """get_movie_stats for each movie, served from memory where possible and with at most one executor hop"""
+    stats = {}
+    if user_data_store.is_fresh():
+        for movie_id in movie_ids:
+            cached = cached_movie_stats(movie_id)
+            if cached is not None:
+                stats[movie_id] = cached
+    missing = [movie_id for movie_id in movie_ids if movie_id not in stats]
+    if missing:
+        stats.update(await run_io(_many_movie_stats, missing))
+    return [stats[movie_id] for movie_id in movie_ids]
 
 def get_user_review_stats(user_id: int) -> Dict[str, Any]:
-    """Calculate user review statistics"""
-    user_data = load_user_data()
-    user_reviews = [r for r in user_data["user_reviews"] if r["user_id"] == user_id]
-    
-    if not user_reviews:
+    """User review statistics, read from counters kept current on every write"""
+    stats = user_data_store.stats_for_user(user_id)
+    if not stats:
         return {"total_reviews": 0, "average_rating": 0, "helpful_votes_received": 0, "watchlist_count": 0}
     
-    total_rating = sum(r["rating"] for r in user_reviews)
-    helpful_votes = sum(r.get("helpful_votes", 0) for r in user_reviews)
-    watchlist_count = len(user_data["watchlists"].get(str(user_id), []))
-    
     return {
-        "total_reviews": len(user_reviews),
-        "average_rating": round(total_rating / len(user_reviews), 1),
-        "helpful_votes_received": helpful_votes,
-        "watchlist_count": watchlist_count
-    }
\ No newline at end of file
+        "total_reviews": stats["review_count"],
+        "average_rating": round(stats["rating_sum"] / stats["review_count"], 1) if stats["review_count"] else 0,
+        "helpful_votes_received": stats["helpful_votes"],
+        "watchlist_count": stats["watchlist_count"]
+    }
+
+# Parse the whole dataset in a process pool at startup instead of lazily
+DATASET_WARMUP = os.environ.get("DATASET_WARMUP", "0") == "1"
+
+def ingest_dataset(workers: Optional[int] = None, seed: bool = True) -> IngestReport:
+    """Validate movie_list in parallel; optionally seed the catalog, review indexes and aggregates from it"""
+    report = ingest(MOVIES_DATA_DIR, INGEST_WORKERS if workers is None else workers)
+    for error in report.errors:
+        logger.warning("Ingest %s/%s line %s: %s", error["movie_id"], error["file"], error["line"], error["message"])
+    if not seed:
+        return report
+
+    movies, stamps, review_stamps, rejected = {}, {}, {}, {}
+    for result in report.results:
+        movie_id = result["movie_id"]
+        if result["metadata"] is None:
+            # Keep folders that failed validation out until their metadata.json changes
+            if result["metadata_stamp"] is not None:
+                rejected[movie_id] = result["metadata_stamp"]
+            continue
+        movies[movie_id] = result["metadata"]
+        stamps[movie_id] = result["metadata_stamp"]
+        review_stamps[movie_id] = result["reviews_stamp"]
+        if result["review_index"] is not None:
+            reviews.put_review_index(reviews.reviews_file(MOVIES_DATA_DIR, movie_id), result["review_index"])
+        if result["aggregate"] is not None:
+            mtime_ns, size = result["reviews_stamp"]
+            dataset_aggregates.put(movie_id, size, mtime_ns, result["aggregate"])
+    catalog.seed(movies, stamps, review_stamps, rejected)
+    get_search_index()
+    return report
+
+def warm_up() -> None:
+    """Load the catalog, honouring DATASET_WARMUP (full parallel ingest) when set, and start the review search index"""
+    if DATASET_WARMUP:
+        ingest_dataset()
+        get_review_search_index()
+    else:
+        catalog.refresh()
+        start_review_search_warmup()
@@ -0,0 +1,271 @@
+# backend/storage.py
+"""File primitives shared by the JSON-backed stores."""
+import asyncio
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from backend.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Directory holding movie_list, users.json and the user-data files (relative to the project root)
+DATA_DIR = os.environ.get("DATA_DIR", "backend/data")
+
+# Threads reserved for blocking file work started from async handlers, so
+# disk waits never occupy Starlette's shared threadpool
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _io_executor
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking file operation on the dedicated I/O executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_io_executor() -> None:
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is not None:
+            _io_executor.shutdown(wait=True)
+            _io_executor = None
+
+
+def atomic_write_json(path: str, data: Any, **dump_kwargs) -> None:
+    """Write JSON to a temp file in the same directory, fsync it and rename it over path.
+
+    Readers see either the old or the new file, never a partial one.
+    """
+    with timed("json_save"):
+        _atomic_write_json(path, data, **dump_kwargs)
+
+
+def _atomic_write_json(path: str, data: Any, **dump_kwargs) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class AppendLog:
+    """Newline-delimited JSON log that is only ever appended to.
+
+    Appends are buffered and handed back as tickets; commit(ticket) makes
+    them durable with group commit: one thread flushes (and fsyncs) every
+    record buffered so far while concurrent committers wait for it, so a
+    burst of mutations costs one flush. fsync runs at most once per
+    `fsync_interval` seconds (0 fsyncs every group). Records flushed in
+    between are fsynced by a timer when the interval ends. A committed
+    record survives a process crash at once, but an OS crash or power
+    loss can drop up to `fsync_interval` seconds of commits.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._synced_at = 0.0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._written = 0
+        self._durable = 0
+        self._flushing = False
+        self._unsynced = False
+        self._fsync_timer: Optional[threading.Timer] = None
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """Yield every complete record, stopping at a torn final line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    logger.warning("Ignoring incomplete record at end of %s", self.path)
+                    return
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring corrupt record at end of %s", self.path)
+                    return
+
+    def read_from(self, offset: int) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+        """Complete records appended since byte `offset`, and the offset after them.
+
+        Used to follow records written by other processes. Returns (None, 0)
+        when the file is now shorter than `offset` (it was truncated after a
+        snapshot), in which case the caller has to reload from the snapshot.
+        """
+        records: List[Dict[str, Any]] = []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return (None, 0) if offset else (records, 0)
+        with f:
+            if os.fstat(f.fileno()).st_size < offset:
+                return None, 0
+            f.seek(offset)
+            for line in f:
+                # A torn final line is still being written; pick it up next time
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring corrupt record at offset %d of %s", offset, self.path)
+                    break
+                offset += len(line)
+        return records, offset
+
+    def publish(self) -> int:
+        """Hand buffered records to the OS (without fsync) so other processes can read them; returns the file size"""
+        with self._io_lock:
+            if self._file is None:
+                return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            self._file.flush()
+            return os.fstat(self._file.fileno()).st_size
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Buffer one record; returns the ticket to pass to commit()"""
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._cond:
+            self._open().write(line)
+            self._written += 1
+            return self._written
+
+    def _flush(self, force_fsync: bool = False) -> None:
+        # Caller holds _io_lock
+        if self._file is None:
+            return
+        self._file.flush()
+        now = time.monotonic()
+        if force_fsync or now - self._synced_at >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._synced_at = now
+            self._unsynced = False
+        else:
+            self._unsynced = True
+            if self._fsync_timer is None:
+                timer = threading.Timer(self._synced_at + self.fsync_interval - now, self._deferred_fsync)
+                timer.daemon = True
+                self._fsync_timer = timer
+                timer.start()
+
+    def _deferred_fsync(self) -> None:
+        # Bounds the loss window for records flushed inside an fsync interval
+        with self._io_lock:
+            self._fsync_timer = None
+            if self._file is not None and self._unsynced:
+                os.fsync(self._file.fileno())
+                self._synced_at = time.monotonic()
+                self._unsynced = False
+
+    def commit(self, ticket: int) -> None:
+        """Block until the record behind `ticket` has been flushed"""
+        with self._cond:
+            while self._durable < ticket and self._flushing:
+                self._cond.wait()
+            if self._durable >= ticket:
+                return
+            # Become the leader for everything buffered so far
+            self._flushing = True
+            target = self._written
+
+        try:
+            with self._io_lock, timed("log_flush"):
+                self._flush()
+        except BaseException:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._flushing = False
+            self._durable = max(self._durable, target)
+            self._cond.notify_all()
+
+    def sync(self) -> None:
+        """Flush and fsync everything appended so far"""
+        with self._io_lock:
+            self._flush(force_fsync=True)
+            with self._cond:
+                self._durable = self._written
+                self._cond.notify_all()
+
+    def truncate(self) -> None:
+        """Drop every record (after they have been folded into a snapshot)"""
+        with self._io_lock:
+            self._close()
+            with open(self.path, "wb"):
+                pass
+
+    def truncate_to(self, offset: int) -> None:
+        """Cut the file back to byte `offset` (the end of the last good record).
+
+        Replay stops at a torn or corrupt line; without this the next append
+        would land on that line and be unreadable on the following load.
+        """
+        with self._io_lock:
+            self._close()
+            try:
+                f = open(self.path, "r+b")
+            except FileNotFoundError:
+                return
+            with f:
+                if os.fstat(f.fileno()).st_size <= offset:
+                    return
+                logger.warning("Truncating %s to its last good record at offset %d", self.path, offset)
+                f.truncate(offset)
+                os.fsync(f.fileno())
+
+    def _close(self) -> None:
+        if self._fsync_timer is not None:
+            self._fsync_timer.cancel()
+            self._fsync_timer = None
+        if self._file is not None:
+            self._flush(force_fsync=True)
+            self._file.close()
+            self._file = None
+        with self._cond:
+            self._durable = self._written
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._io_lock:
+            self._close()
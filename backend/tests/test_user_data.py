@@ -0,0 +1,29 @@
+# backend/tests/test_user_data.py
+from backend.movies.user_data import UserDataStore
+
+
+def _store(tmp_path):
+    return UserDataStore(str(tmp_path / "user_data.json"), str(tmp_path / "user_data.log"), fsync_interval=0)
+
+
+def _watchlist(store, user_id=1):
+    return [item["movie_id"] for item in store.data["watchlists"].get(str(user_id), [])]
+
+
+def test_commit_after_torn_tail_survives_restart(tmp_path):
+    store = _store(tmp_path)
+    for movie_id in ("m0", "m1"):
+        store.commit("watchlist_add", user_id=1, item={"movie_id": movie_id})
+    store.log.close()
+
+    # A crash mid-append leaves half a record at the end of the log
+    with open(store.log.path, "ab") as f:
+        f.write(b'{"seq":3,"op":"watchlist_add","user_id":1,"it')
+
+    store = _store(tmp_path)
+    assert _watchlist(store) == ["m0", "m1"]
+    store.commit("watchlist_add", user_id=1, item={"movie_id": "m2"})
+    store.log.close()
+
+    store = _store(tmp_path)
+    assert _watchlist(store) == ["m0", "m1", "m2"]